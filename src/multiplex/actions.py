@@ -9,6 +9,9 @@ class Action:
 
 
 class BoxAction:
+    # actions that can not change the box content or size only repaint the title row
+    changes_box = True
+
     def run(self, box_holder):
         raise NotImplementedError
 
@@ -16,6 +19,7 @@ class BoxAction:
 @dataclass
 class SetTitle(BoxAction):
     title: str
+    changes_box = False
 
     def run(self, box_holder):
         title = self.title
@@ -44,6 +48,7 @@ class ToggleWrap(BoxAction):
 @dataclass
 class UpdateMetadata(BoxAction):
     metadata: dict
+    changes_box = False
 
     def run(self, box_holder):
         box_holder.iterator.metadata.update(self.metadata)
@@ -53,6 +58,10 @@ class UpdateMetadata(BoxAction):
 class BoxActions(BoxAction):
     actions: List[BoxAction]
 
+    @property
+    def changes_box(self):
+        return any(getattr(action, "changes_box", True) for action in self.actions)
+
     def run(self, box_holder):
         for action in self.actions:
             if isinstance(action, BoxAction):
@@ -1,25 +1,235 @@
 import io
+import os
+import re
+import threading
+from dataclasses import dataclass, field
 
 from easyansi import screen, cursor, drawing, attributes
 from easyansi import colors_rgb as colors
 from easyansi._core.codes import CSI
+from pyte.screens import wcwidth
+
+from multiplex import palette, writer
 
 
 FULL_REFRESH = object()
 
+# output written before the rows of the current frame
 buffer = io.StringIO()
+# output written after the rows of the current frame (e.g. cursor positioning)
+post_buffer = io.StringIO()
+# row -> text of that row in the current frame
+rows = {}
+# (from_row, to_row) of box contents in the current frame, candidates for scrolling instead of redrawing
+regions = []
+# CLEARED or UNKNOWN if the current frame clears or overwrites the whole screen
+screen_reset = None
+# row -> (text, width) last emitted for that row. rows missing from it are blank, unless the
+# screen content is unknown (before the first clear and after drawing the help screen)
+shadow = {}
+shadow_known = False
+render_thread = None
+color_depth = palette.TRUECOLOR
+synchronized_output = False
+
+CLEARED = "cleared"
+UNKNOWN = "unknown"
+
+SGR_PATTERN = re.compile(f"{re.escape(CSI)}[0-9;]*m")
 
 
 def prnt(text):
     buffer.write(str(text))
 
 
+def post_prnt(text):
+    post_buffer.write(str(text))
+
+
+@dataclass
+class Frame:
+    pre: str = ""
+    rows: dict = field(default_factory=dict)
+    post: str = ""
+    screen_reset: str = None
+    regions: list = field(default_factory=list)
+
+    def merge(self, other):
+        # other is a later frame, rows it does not set are kept from this one unless it resets the screen
+        post = self.post + other.post
+        if other.screen_reset:
+            return Frame(other.pre, other.rows, post, other.screen_reset, other.regions)
+        rows = {**self.rows, **other.rows}
+        merged_regions = list(dict.fromkeys(self.regions + other.regions))
+        return Frame(self.pre + other.pre, rows, post, self.screen_reset, merged_regions)
+
+
+class RenderThread(threading.Thread):
+    def __init__(self):
+        super().__init__(name="multiplex-render", daemon=True)
+        self.condition = threading.Condition()
+        self.frame = None
+        self.stopped = False
+
+    def submit(self, frame):
+        with self.condition:
+            # frames the thread did not get to yet are merged so only the latest content of each row is written
+            self.frame = frame if self.frame is None else self.frame.merge(frame)
+            self.condition.notify()
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        self.join()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.frame is None and not self.stopped:
+                    self.condition.wait()
+                frame, self.frame = self.frame, None
+            if frame is None:
+                return
+            output = _frame_code(frame)
+            if output:
+                screen.prnt(output)
+
+
+def start_render_thread():
+    global render_thread
+    render_thread = RenderThread()
+    render_thread.start()
+
+
+def stop_render_thread():
+    global render_thread
+    if render_thread:
+        render_thread.stop()
+        render_thread = None
+
+
 def flush():
-    global buffer
-    if not buffer.tell():
-        return
-    screen.prnt(buffer.getvalue())
+    global buffer, post_buffer, rows, screen_reset, regions
+    frame = Frame(buffer.getvalue(), rows, post_buffer.getvalue(), screen_reset, regions)
     buffer = io.StringIO()
+    post_buffer = io.StringIO()
+    rows = {}
+    regions = []
+    screen_reset = None
+    if render_thread:
+        render_thread.submit(frame)
+        return
+    output = _frame_code(frame)
+    if not output:
+        return
+    if writer.is_active():
+        writer.write(output)
+    else:
+        screen.prnt(output)
+
+
+def _frame_code(frame):
+    global shadow_known
+    if frame.screen_reset:
+        shadow.clear()
+        shadow_known = frame.screen_reset == CLEARED
+    output = io.StringIO()
+    output.write(frame.pre)
+    for from_row, to_row in frame.regions:
+        output.write(_scroll_code(frame.rows, from_row, to_row))
+    for row in sorted(frame.rows):
+        output.write(_row_update_code(row, frame.rows[row]))
+    output.write(frame.post)
+    if synchronized_output and output.tell():
+        # the terminal presents the frame once it is complete
+        return f"{BEGIN_SYNCHRONIZED_UPDATE}{output.getvalue()}{END_SYNCHRONIZED_UPDATE}"
+    return output.getvalue()
+
+
+def _text_width(text):
+    return sum(max(0, wcwidth(c)) for c in SGR_PATTERN.sub("", text))
+
+
+def _common_prefix(old_text, new_text):
+    # returns index into new_text, screen column and active style at the longest common prefix
+    # of both rows that ends on a character boundary
+    limit = len(os.path.commonprefix((old_text, new_text)))
+    index = column = 0
+    style = ""
+    result = (0, 0, "")
+    while index < limit:
+        if new_text[index] == "\x1b":
+            end = new_text.index("m", index) + 1
+            if end > limit:
+                break
+            sequence = new_text[index:end]
+            style = "" if sequence == RESET else f"{style}{sequence}"
+            index = end
+        else:
+            column += max(0, wcwidth(new_text[index]))
+            index += 1
+        if index == len(new_text) or new_text[index] == "\x1b" or wcwidth(new_text[index]) > 0:
+            result = (index, column, style)
+    return result
+
+
+def _find_shift(new_rows, old_rows):
+    # returns the shift (positive moves content up) after which all overlapping rows of the region match,
+    # if it leaves more rows in place than not scrolling at all
+    size = len(new_rows)
+    best_shift, best_matches = 0, sum(1 for new, old in zip(new_rows, old_rows) if new == old)
+    for shift in range(1, size - best_matches):
+        if new_rows[0] == old_rows[shift] and new_rows[: size - shift] == old_rows[shift:]:
+            return shift
+        if new_rows[shift] == old_rows[0] and new_rows[shift:] == old_rows[: size - shift]:
+            return -shift
+    return best_shift
+
+
+def _scroll_code(frame_rows, from_row, to_row):
+    if not shadow_known and any(row not in shadow for row in range(from_row, to_row + 1)):
+        return ""
+    blank = ("", 0)
+    region = range(from_row, to_row + 1)
+    old_entries = [shadow.get(row, blank) for row in region]
+    new_rows = [frame_rows.get(row) for row in region]
+    shift = _find_shift(new_rows, [text for text, _ in old_entries])
+    if not shift:
+        return ""
+    if shift > 0:
+        old_entries = old_entries[shift:] + [blank] * shift
+        shift_code = f"{CSI}{shift}M"
+    else:
+        old_entries = [blank] * -shift + old_entries[:shift]
+        shift_code = f"{CSI}{-shift}L"
+    for row, entry in zip(region, old_entries):
+        shadow[row] = entry
+    # delete or insert lines at the top of the scrolling region to move the box content
+    return f"{CSI}{from_row + 1};{to_row + 1}r{cursor.locate_code(0, from_row)}{RESET}{shift_code}{CSI}r"
+
+
+def _row_update_code(row, text):
+    width = _text_width(text)
+    previous = shadow.get(row, ("", 0) if shadow_known else None)
+    shadow[row] = (text, width)
+    if previous is None:
+        return f"{cursor.locate_code(0, row)}{CLEAR_LINE}{RESET}{text}{RESET}"
+    previous_text, previous_width = previous
+    if previous_text == text:
+        return ""
+    index, column, style = _common_prefix(previous_text, text)
+    result = f"{cursor.locate_code(column, row)}{RESET}{style}{text[index:]}"
+    if not text.endswith(RESET):
+        result += RESET
+    if width < previous_width:
+        result += CLEAR_LINE_END
+    return result
+
+
+def invalidate():
+    global screen_reset
+    screen_reset = UNKNOWN
 
 
 NONE = object()
@@ -51,8 +261,28 @@ theme = Theme
 
 
 CLEAR_LINE = CSI + "2K"
+CLEAR_LINE_END = CSI + "K"
 ENABLE_ALT_BUFFER = CSI + "?1049h"
 DISABLE_ALT_BUFFER = CSI + "?1049l"
+SYNCHRONIZED_UPDATE_MODE = 2026
+BEGIN_SYNCHRONIZED_UPDATE = f"{CSI}?{SYNCHRONIZED_UPDATE_MODE}h"
+END_SYNCHRONIZED_UPDATE = f"{CSI}?{SYNCHRONIZED_UPDATE_MODE}l"
+# DECRQM, the terminal replies with a mode report when it knows the mode
+SYNCHRONIZED_UPDATE_QUERY = f"{CSI}?{SYNCHRONIZED_UPDATE_MODE}$p"
+ENABLE_FOCUS_REPORTING = f"{CSI}?1004h"
+DISABLE_FOCUS_REPORTING = f"{CSI}?1004l"
+ENABLE_BRACKETED_PASTE = f"{CSI}?2004h"
+DISABLE_BRACKETED_PASTE = f"{CSI}?2004l"
+
+
+def set_color_depth(depth):
+    global color_depth
+    color_depth = depth
+
+
+def set_synchronized_output(value):
+    global synchronized_output
+    synchronized_output = value
 
 
 def color_code(pair):
@@ -61,19 +291,40 @@ def color_code(pair):
         fg = (None, None, None)
     if not bg or bg is NONE:
         bg = (None, None, None)
-    return colors.color_code(*fg, *bg)
+    if color_depth == palette.TRUECOLOR:
+        return colors.color_code(*fg, *bg)
+    codes = []
+    if fg[0] is not None:
+        codes.extend(palette.convert((palette.FG_256, 2, *fg), color_depth))
+    if bg[0] is not None:
+        codes.extend(palette.convert((palette.BG_256, 2, *bg), color_depth))
+    return f'{CSI}{";".join(str(c) for c in codes)}m'
 
 
 def setup():
     screen.prnt(ENABLE_ALT_BUFFER)
+    # frames are only wrapped in synchronized updates once the terminal reports supporting them
+    screen.prnt(SYNCHRONIZED_UPDATE_QUERY)
+    screen.prnt(ENABLE_FOCUS_REPORTING)
+    screen.prnt(ENABLE_BRACKETED_PASTE)
     cursor.hide()
 
 
 def restore():
-    global buffer
+    global buffer, post_buffer, screen_reset, shadow_known
+    stop_render_thread()
     clear()
     buffer = io.StringIO()
+    post_buffer = io.StringIO()
+    rows.clear()
+    regions.clear()
+    screen_reset = None
+    shadow.clear()
+    shadow_known = False
+    set_synchronized_output(False)
     cursor.show()
+    screen.prnt(DISABLE_FOCUS_REPORTING)
+    screen.prnt(DISABLE_BRACKETED_PASTE)
     screen.clear()
     screen.prnt(DISABLE_ALT_BUFFER)
 
@@ -83,47 +334,47 @@ def get_size():
 
 
 def clear():
+    global screen_reset
     prnt(screen.clear_code())
+    screen_reset = CLEARED
+
+
+def text_box(from_row, to_row, lines):
+    regions.append((from_row, to_row))
+    for offset, row in enumerate(range(from_row, to_row + 1)):
+        rows[row] = lines[offset] if offset < len(lines) else ""
 
 
-def text_box(from_row, to_row, text):
-    for line_num in range(to_row, from_row - 1, -1):
-        prnt(screen.clear_line_code(line_num))
-    prnt(text)
+def row(row, text):
+    rows[row] = text
 
 
-def title(row, text, cols, hline_color):
-    prnt(screen.clear_line_code(row))
-    prnt(color_code(hline_color))
-    prnt(drawing.hline_code(1))
-    prnt(RESET)
-    prnt(text)
-    prnt(RESET)
+def title_code(text, cols, hline_color):
     offset = 1 + len(text)
-    prnt(color_code(hline_color))
-    prnt(drawing.hline_code(cols - offset))
-    prnt(RESET)
+    return (
+        f"{color_code(hline_color)}{drawing.hline_code(1)}{RESET}{text}{RESET}"
+        f"{color_code(hline_color)}{drawing.hline_code(cols - offset)}{RESET}"
+    )
 
 
-def status_bar(row, text):
-    prnt(screen.clear_line_code(row))
-    prnt(text)
-    prnt(RESET)
+def status_bar_code(text):
+    return f"{text}{RESET}"
 
 
 def move_cursor(col, row):
-    prnt(cursor.locate_code(col, row))
+    post_prnt(cursor.locate_code(col, row))
 
 
 def show_cursor():
-    prnt(cursor.show_code())
+    post_prnt(cursor.show_code())
 
 
 def hide_cursor():
-    prnt(cursor.hide_code())
+    post_prnt(cursor.hide_code())
 
 
 def help_screen(current_line, lines, cols, descriptions):
+    invalidate()
     prnt(screen.clear_code())
     prnt(drawing.box_code(width=cols, height=lines))
     prnt(cursor.locate_code(2, 1))
@@ -1,7 +1,7 @@
 import logging
+import re
 
-from multiplex import ansi
-from multiplex.buffer import Buffer
+from multiplex import ansi, tasks
 from multiplex.enums import ViewLocation
 
 logger = logging.getLogger("multiplex.box")
@@ -12,13 +12,41 @@ class BoxHolder:
         self.id = id(self)
         self.index = index
         self.iterator = iterator
-        self.buffer = Buffer(buffer_lines=viewer.buffer_lines)
-        self.state = BoxState(box_height)
+        self.buffer = viewer.create_buffer(iterator)
+        self.state = BoxState(box_height, on_layout_change=viewer.layout.invalidate)
         self.box = TextBox(viewer, self)
+        self.line_rate = RateMeter()
+        self.last_paint_time = 0
+
+
+class RateMeter:
+    # counts events in consecutive windows, the rate is the one of the last complete window
+    def __init__(self, window=1.0):
+        self.window = window
+        self.window_start = 0
+        self.count = 0
+        self.last_rate = 0
+
+    def add(self, count, now):
+        elapsed = now - self.window_start
+        if elapsed >= self.window:
+            self.last_rate = self.count / elapsed if elapsed < 2 * self.window else 0
+            self.window_start = now
+            self.count = 0
+        self.count += count
+
+    def rate(self, now):
+        elapsed = now - self.window_start
+        if elapsed >= 2 * self.window:
+            return 0
+        if elapsed >= self.window:
+            return self.count / elapsed
+        return self.last_rate
 
 
 class BoxState:
-    def __init__(self, box_height):
+    def __init__(self, box_height, on_layout_change=None):
+        self.on_layout_change = on_layout_change
         self.wrap = True
         self.auto_scroll = True
         self.input_mode = False
@@ -27,10 +55,35 @@ class BoxState:
         self.buffer_start_line = 0
         self.first_column = 0
         self.view_longest_line = 0
+        self.search_pattern = None
+        # raw line of the last match, n/N continue from it since the view can not always start at a match
+        self.search_raw_line = None
         self.text = None
         self.changed_height = box_height is not None
         self.box_height = box_height
 
+    @property
+    def collapsed(self):
+        return self._collapsed
+
+    @collapsed.setter
+    def collapsed(self, value):
+        self._collapsed = value
+        self._layout_changed()
+
+    @property
+    def box_height(self):
+        return self._box_height
+
+    @box_height.setter
+    def box_height(self, value):
+        self._box_height = value
+        self._layout_changed()
+
+    def _layout_changed(self):
+        if self.on_layout_change:
+            self.on_layout_change()
+
 
 class TextBox:
     def __init__(self, view, holder):
@@ -38,6 +91,7 @@ class TextBox:
         self.holder = holder
         self.buffer = self.holder.buffer
         self.state = self.holder.state
+        self.search_task = None
 
     @property
     def index(self):
@@ -68,7 +122,7 @@ class TextBox:
         ansi.text_box(
             from_row=screen_y_1,
             to_row=screen_y_2,
-            text="".join(lines),
+            lines=lines,
         )
 
     def update_text(self):
@@ -81,8 +135,10 @@ class TextBox:
             start_column=self.state.first_column,
             wrap=self.state.wrap,
         )
-        if not self.state.wrap:
-            value = max(line_length for line_length, _ in lines) if lines else 0
+        if not self.is_wrapped:
+            value = self.buffer.get_longest_line(self.min_start_line, self.buffer.get_max_line(wrap=False))
+            if value is None:
+                value = max(line_length for line_length, _ in lines) if lines else 0
             self.state.view_longest_line = value
         return [line for _, line in lines]
 
@@ -114,46 +170,100 @@ class TextBox:
 
     def move_right(self):
         state = self.state
-        if state.wrap:
+        if self.is_wrapped:
             return False
         state.first_column = min(state.first_column + 1, self.max_first_column)
         return self.index
 
     def move_left(self):
         state = self.state
-        if state.wrap:
+        if self.is_wrapped:
             return False
         state.first_column = max(0, state.first_column - 1)
         return self.index
 
     def move_half_screen_right(self):
         state = self.state
-        if state.wrap:
+        if self.is_wrapped:
             return False
         state.first_column = min(state.first_column + self.view.cols // 2, self.max_first_column)
         return self.index
 
     def move_half_screen_left(self):
         state = self.state
-        if state.wrap:
+        if self.is_wrapped:
             return False
         state.first_column = max(0, state.first_column - self.view.cols // 2)
         return self.index
 
     def move_right_until_end(self):
         state = self.state
-        if state.wrap:
+        if self.is_wrapped:
             return False
         state.first_column = self.max_first_column
         return self.index
 
     def move_left_until_start(self):
         state = self.state
-        if state.wrap:
+        if self.is_wrapped:
             return False
         state.first_column = 0
         return self.index
 
+    def search(self, pattern):
+        if not pattern:
+            return False
+        self.state.search_pattern = pattern
+        self.state.search_raw_line = None
+        return self._jump_to_match(self.buffer.get_raw_line(self.state.buffer_start_line, self.state.wrap))
+
+    def search_next(self, reverse=False):
+        if not self.state.search_pattern:
+            return False
+        raw_line = self.state.search_raw_line
+        if raw_line is None:
+            raw_line = self.buffer.get_raw_line(self.state.buffer_start_line, self.state.wrap)
+        return self._jump_to_match(raw_line - 1 if reverse else raw_line + 1, reverse)
+
+    def jump_to_time(self, timestamp):
+        return self._jump_to_raw_line(self.buffer.find_time(timestamp))
+
+    def _jump_to_match(self, start_raw_line, reverse=False):
+        pattern = self.state.search_pattern
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            logger.warning(f"Invalid search pattern {pattern}: {e}")
+            return False
+        runner = self.view.tasks
+        if self.search_task:
+            runner.cancel(self.search_task)
+        self.search_task = runner.submit(
+            "search", self._search(pattern, start_raw_line, reverse), priority=tasks.INTERACTIVE
+        )
+        return False
+
+    def _search(self, pattern, start_raw_line, reverse):
+        steps = self.buffer.search_steps(pattern, start_raw_line, reverse, wrap_around=True)
+        for progress, raw_line in steps:
+            if raw_line is not None:
+                self.state.search_raw_line = raw_line
+                if self._jump_to_raw_line(raw_line):
+                    self.view.mark_view()
+                break
+            yield progress
+        self.search_task = None
+
+    def _jump_to_raw_line(self, raw_line):
+        line = self.buffer.get_line_number(raw_line, self.state.wrap)
+        if line is None:
+            if raw_line < self.buffer.raw_lines:
+                return False
+            line = self.max_start_line
+        self.state.auto_scroll = False
+        self.state.buffer_start_line = max(self.min_start_line, min(self.max_start_line, line))
+        return True
+
     def increase_box_height(self):
         self.state.box_height = min(self.view.get_max_box_line(), self.state.box_height + 1)
         self.state.changed_height = True
@@ -185,7 +295,7 @@ class TextBox:
             return False
         self.state.first_column = 0
         self.state.wrap = new_value
-        if not self.state.auto_scroll or self.state.stream_done:
+        if (not self.state.auto_scroll or self.state.stream_done) and not self.buffer.line_filter:
             line = self.state.buffer_start_line
             result = self.buffer.convert_line_number(line, from_wrapped=initial_value)
             if result is None:
@@ -194,6 +304,18 @@ class TextBox:
             self.state.buffer_start_line = result
         return True
 
+    def filter(self, pattern):
+        raw_line = self.buffer.get_raw_line(self.state.buffer_start_line, self.state.wrap)
+        try:
+            self.buffer.set_filter(pattern)
+        except re.error as e:
+            logger.warning(f"Invalid filter pattern {pattern}: {e}")
+            return False
+        self.state.first_column = 0
+        line = self.buffer.get_line_number(raw_line, self.state.wrap)
+        self.state.buffer_start_line = max(self.min_start_line, min(self.max_start_line, line or 0))
+        return ansi.FULL_REFRESH
+
     def toggle_collapse(self, value=None):
         if value is not None:
             collapsed = value
@@ -229,6 +351,10 @@ class TextBox:
             return False
         return True
 
+    @property
+    def is_wrapped(self):
+        return self.state.wrap and not self.buffer.line_filter
+
     @property
     def is_maximized(self):
         return self.view.maximized and self.is_focused
@@ -259,11 +385,16 @@ class TextBox:
     def set_minmax_up_motion(self, value):
         return self._set_min_max_motion(value, self.min_start_line)
 
-    def set_width(self, width):
-        raw_line = self.buffer.wrapping_buffer.self_to_raw.get(self.state.buffer_start_line, 0)
-        self.buffer.width = width
-        if self.state.wrap and (not self.state.auto_scroll or self.state.stream_done):
-            self.state.buffer_start_line = self.buffer.wrapping_buffer.raw_to_self[raw_line]
+    def reflow(self, width):
+        wrapping_buffer = yield from self.buffer.reflow(width)
+        if wrapping_buffer is None:
+            return
+        raw_line = self.buffer.get_raw_line(self.state.buffer_start_line, wrap=True)
+        self.buffer.wrapping_buffer = wrapping_buffer
+        if self.is_wrapped and (not self.state.auto_scroll or self.state.stream_done):
+            line = self.buffer.get_line_number(raw_line, wrap=True)
+            if line is not None:
+                self.state.buffer_start_line = line
 
     def _set_min_max_motion(self, value, min_value):
         self.state.buffer_start_line = max(min_value, min(self.max_start_line, value))
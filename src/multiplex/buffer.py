@@ -1,16 +1,24 @@
+import bisect
 import collections
 import io
+import itertools
+import re
 import shutil
+import time
+from array import array
 
 import pyte
 from pyte import graphics as g
 from pyte.screens import Char, wcwidth, Margins
 
+from multiplex import ansi, palette
 from multiplex.ansi import CSI
 
 TERMINATE = "m"
 
 UNDEFINED = object()
+# orders lines of all buffers by arrival, lines written in the same millisecond included
+LINE_SEQUENCE = itertools.count()
 RESET_TEXT_ATTRS = set(list(range(1, 10)))
 BOLD = 1
 
@@ -29,6 +37,15 @@ reset = f"{CSI}0{TERMINATE}"
 index_to_char_meta = {0: empty_meta}
 char_meta_to_index = {empty_meta: 0}
 index_to_ansi = {0: reset}
+# (color depth, style index) -> sequence of the style with its colors converted to that depth
+index_depth_ansi = {}
+# (color depth, from index, to index) -> shortest sequence that changes the first style to the second
+index_transition_ansi = {}
+TEXT_ATTR_OFF = {1: 22, 2: 22, 3: 23, 4: 24, 5: 25, 6: 25, 7: 27, 8: 28, 9: 29}
+# raw lines written into a new wrapping buffer per reflow iteration
+REFLOW_CHUNK_LINES = 50
+# lines matched against a search pattern between progress reports
+SEARCH_CHUNK_LINES = 200
 
 counter = 0
 
@@ -120,16 +137,7 @@ class Screen(pyte.Screen):
             index = counter
             char_meta_to_index[new_char_meta] = index
             index_to_char_meta[index] = new_char_meta
-            codes = []
-            c = new_char_meta
-            if c.fg:
-                codes.extend(c.fg)
-            if c.bg:
-                codes.extend(c.bg)
-            if c.bold:
-                codes.extend(list(c.bold))
-            ansi = f'{CSI}{";".join(str(c) for c in codes)}{TERMINATE}'
-            index_to_ansi[index] = ansi
+            index_to_ansi[index] = _style_code(new_char_meta, palette.TRUECOLOR)
 
         self.cursor.attrs = Char(" ", fg=index)
 
@@ -187,10 +195,84 @@ class Screen(pyte.Screen):
         return []
 
 
+class MaxIndex:
+    # positions are stored relative to offset, so the tree only spans positions that were not removed
+    def __init__(self, size=1024):
+        self.min_size = size
+        self.size = size
+        self.offset = 0
+        self.removed = 0
+        self.end = 0
+        self.tree = array("I", bytes(4 * 2 * size))
+
+    def set(self, position, value):
+        if position < self.removed:
+            return
+        if position - self.offset >= self.size:
+            self._grow(position)
+        self.end = max(self.end, position + 1)
+        tree = self.tree
+        i = position - self.offset + self.size
+        tree[i] = value
+        i >>= 1
+        while i:
+            new_value = max(tree[2 * i], tree[2 * i + 1])
+            if tree[i] == new_value:
+                break
+            tree[i] = new_value
+            i >>= 1
+
+    def query(self, start, end):
+        # max value in [start, end)
+        tree = self.tree
+        result = 0
+        start = max(0, start - self.offset) + self.size
+        end = min(end - self.offset, self.size) + self.size
+        while start < end:
+            if start & 1:
+                result = max(result, tree[start])
+                start += 1
+            if end & 1:
+                end -= 1
+                result = max(result, tree[end])
+            start >>= 1
+            end >>= 1
+        return result
+
+    def remove_before(self, position):
+        for i in range(self.removed, min(position, self.end)):
+            self.set(i, 0)
+        self.removed = max(self.removed, position)
+        if self.removed - self.offset >= self.size // 2:
+            size = self.min_size
+            while size <= self.end - self.removed:
+                size *= 2
+            self._rebuild(self.removed, size)
+
+    def _grow(self, position):
+        size = self.size
+        while size <= position - self.offset:
+            size *= 2
+        self._rebuild(self.offset, size)
+
+    def _rebuild(self, offset, size):
+        tree = array("I", bytes(4 * 2 * size))
+        start = self.size + offset - self.offset
+        leaves = self.tree[start : min(start + size, 2 * self.size)]
+        tree[size : size + len(leaves)] = leaves
+        for i in range(size - 1, 0, -1):
+            tree[i] = max(tree[2 * i], tree[2 * i + 1])
+        self.offset = offset
+        self.size = size
+        self.tree = tree
+
+
 class LinedBuffer:
     BIG = 1000000
 
     def __init__(self, width=None):
+        # only unwrapped buffers can be scrolled horizontally, so only they track line widths
+        self.line_widths = MaxIndex() if width is None else None
         self.width = width or self.BIG
         self.screen = Screen(lines=self.BIG, columns=self.width, line_buffer=self)
         self.stream = pyte.Stream(screen=self.screen)
@@ -209,22 +291,41 @@ class LinedBuffer:
             dirty_list = sorted(list(dirty))
             self.max_line = max(self.max_line, *dirty_list)
             self.screen.dirty.clear()
+            if self.line_widths:
+                buffer = self.screen.buffer
+                for line_number in dirty_list:
+                    keys = buffer[line_number].keys()
+                    self.line_widths.set(line_number, (max(keys) + 1) if keys else 0)
             return dirty_list
         return []
 
+    def get_line_text(self, line_number):
+        screen_line = self.screen.buffer.get(line_number)
+        if not screen_line:
+            return ""
+        return "".join(screen_line[x].data for x in range(max(screen_line.keys()) + 1))
+
     def remove_lines(self, lines, start_line):
         new_min_line = start_line + lines
         for i in range(start_line, new_min_line):
             self.screen.buffer.pop(i, None)
+        if self.line_widths:
+            self.line_widths.remove_before(new_min_line)
         return new_min_line
 
     def get_lines(self, lines, start_line, columns, start_column):
-        result = []
         if start_line > self.max_line:
-            return result
-        last_char_meta_index = 0
+            return []
+        return self.get_lines_at(range(start_line, lines + start_line), columns, start_column)
+
+    def get_lines_at(self, line_numbers, columns, start_column):
+        # lines start from the default style and do not reset at their end, the renderer terminates each row
+        result = []
         buffer = self.screen.buffer
-        for line_num in range(start_line, lines + start_line):
+        depth = ansi.color_depth
+        for line_num in line_numbers:
+            # each line is self contained so rows can be rendered independently
+            last_char_meta_index = 0
             screen_line = buffer[line_num]
             keys = screen_line.keys()
             line_length = (max(keys) + 1) if keys else 0
@@ -237,21 +338,301 @@ class LinedBuffer:
                 current_char = screen_line[x]
                 char_meta_index = current_char.fg
                 if char_meta_index != last_char_meta_index:
-                    current_line_buffer.write(reset)
-                    if char_meta_index:
-                        current_line_buffer.write(index_to_ansi[char_meta_index])
+                    transition = (depth, last_char_meta_index, char_meta_index)
+                    code = index_transition_ansi.get(transition)
+                    if code is None:
+                        code = index_transition_ansi[transition] = _transition_code(*transition)
+                    current_line_buffer.write(code)
                     last_char_meta_index = char_meta_index
                 char_data = current_char.data
                 current_line_buffer.write(char_data)
                 assert sum(map(wcwidth, char_data[1:])) == 0
                 is_wide_char = wcwidth(char_data[0]) == 2
-            # add reset at the end
-            if last_char_meta_index and line_num == lines + start_line - 1:
-                current_line_buffer.write(reset)
             result.append((line_length, current_line_buffer.getvalue()))
         return result
 
 
+def _style_code(meta, depth):
+    codes = []
+    if meta.fg:
+        codes.extend(palette.convert(meta.fg, depth))
+    if meta.bg:
+        codes.extend(palette.convert(meta.bg, depth))
+    if meta.bold:
+        codes.extend(meta.bold)
+    return f'{CSI}{";".join(str(c) for c in codes)}{TERMINATE}'
+
+
+def _depth_style_code(index, depth):
+    if depth == palette.TRUECOLOR:
+        return index_to_ansi[index]
+    key = (depth, index)
+    code = index_depth_ansi.get(key)
+    if code is None:
+        code = index_depth_ansi[key] = _style_code(index_to_char_meta[index], depth)
+    return code
+
+
+def _transition_code(depth, from_index, to_index):
+    if not to_index:
+        return reset
+    full = _depth_style_code(to_index, depth)
+    if not from_index:
+        return full
+    from_meta = index_to_char_meta[from_index]
+    to_meta = index_to_char_meta[to_index]
+    codes = []
+    if from_meta.fg != to_meta.fg:
+        codes.extend(palette.convert(to_meta.fg, depth) if to_meta.fg else (39,))
+    if from_meta.bg != to_meta.bg:
+        codes.extend(palette.convert(to_meta.bg, depth) if to_meta.bg else (49,))
+    from_attrs = set(from_meta.bold)
+    to_attrs = set(to_meta.bold)
+    off_codes = {TEXT_ATTR_OFF[attr] for attr in from_attrs - to_attrs}
+    codes.extend(sorted(off_codes))
+    # bold and faint share their off code, so turning one off may require turning the other back on
+    readded = {attr for attr in to_attrs if TEXT_ATTR_OFF[attr] in off_codes}
+    codes.extend(sorted((to_attrs - from_attrs) | readded))
+    delta = f'{CSI}{";".join(str(c) for c in codes)}{TERMINATE}'
+    with_reset = f"{CSI}0;{full[len(CSI):]}"
+    return delta if len(delta) <= len(with_reset) else with_reset
+
+
+def _required_literals(pattern):
+    # per top level alternative, the literal runs that any match of it must contain. an alternative without such
+    # runs, e.g. when none can be safely extracted, may match any line
+    if re.compile(pattern).flags & re.VERBOSE:
+        return [[]]
+    result = [[]]
+    current = []
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        literal = None
+        if c == "\\":
+            escaped = pattern[i + 1 : i + 2]
+            if escaped in "xuUN" or escaped.isdigit():
+                return [[]]
+            if not escaped.isalnum():
+                literal = escaped
+            i += 1
+        elif c == "[":
+            i += 1
+            if pattern[i : i + 1] == "^":
+                i += 1
+            if pattern[i : i + 1] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "|" and not depth:
+            if current:
+                result[-1].append("".join(current))
+                current = []
+            result.append([])
+        elif c in "*?{":
+            if current:
+                current.pop()
+            if c == "{":
+                i = pattern.find("}", i)
+                if i == -1:
+                    return [[]]
+        elif c not in ".^$+":
+            literal = c
+        if literal is not None and not depth:
+            current.append(literal)
+        elif current:
+            result[-1].append("".join(current))
+            current = []
+        i += 1
+    if current:
+        result[-1].append("".join(current))
+    return result
+
+
+def _compile_pattern(pattern):
+    flags = 0 if any(c.isupper() for c in pattern) else re.IGNORECASE
+    return re.compile(pattern, flags)
+
+
+def _trigrams(text):
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    SEGMENT_LINES = 256
+    BLOOM_BITS = 1 << 16
+
+    def __init__(self):
+        self.segments = {}
+
+    def add(self, line_number, text):
+        segment = line_number // self.SEGMENT_LINES
+        bloom = self.segments.get(segment)
+        if bloom is None:
+            bloom = self.segments[segment] = bytearray(self.BLOOM_BITS // 8)
+        for bit in self._bits(_trigrams(text.lower())):
+            bloom[bit >> 3] |= 1 << (bit & 7)
+
+    def remove_before(self, line_number):
+        for segment in [s for s in self.segments if (s + 1) * self.SEGMENT_LINES <= line_number]:
+            del self.segments[segment]
+
+    def candidate_lines(self, pattern, start_line, end_line, reverse=False):
+        alternatives = []
+        for literals in _required_literals(pattern):
+            trigrams = set()
+            for literal in literals:
+                trigrams |= _trigrams(literal.lower())
+            alternatives.append(self._bits(trigrams))
+        if not all(alternatives):
+            alternatives = None
+        segment_lines = self.SEGMENT_LINES
+        first_segment = start_line // segment_lines
+        last_segment = end_line // segment_lines
+        segments = range(first_segment, last_segment + 1)
+        for segment in reversed(segments) if reverse else segments:
+            if alternatives:
+                bloom = self.segments.get(segment)
+                if bloom is None or not any(
+                    all(bloom[bit >> 3] & (1 << (bit & 7)) for bit in bits) for bits in alternatives
+                ):
+                    continue
+            lines = range(max(start_line, segment * segment_lines), min(end_line + 1, (segment + 1) * segment_lines))
+            yield from reversed(lines) if reverse else lines
+
+    def _bits(self, trigrams):
+        mask = self.BLOOM_BITS - 1
+        result = set()
+        for trigram in trigrams:
+            h = hash(trigram)
+            result.add(h & mask)
+            result.add((h >> 16) & mask)
+        return result
+
+
+class LineFilter:
+    def __init__(self, pattern, lined_buffer):
+        self.pattern = pattern
+        self.regex = _compile_pattern(pattern)
+        self.lined_buffer = lined_buffer
+        self.lines = []
+        self.offset = 0
+
+    def update(self, line_number, text):
+        lines = self.lines
+        index = bisect.bisect_left(lines, line_number)
+        present = index < len(lines) and lines[index] == line_number
+        if self.regex.search(text):
+            if not present:
+                lines.insert(index, line_number)
+        elif present:
+            del lines[index]
+
+    def remove_before(self, line_number):
+        removed = bisect.bisect_left(self.lines, line_number)
+        del self.lines[:removed]
+        self.offset += removed
+
+    def get_lines(self, lines, start_line, columns, start_column):
+        start_index = max(0, start_line - self.offset)
+        line_numbers = self.lines[start_index : start_index + lines]
+        return self.lined_buffer.get_lines_at(line_numbers, columns, start_column)
+
+    @property
+    def min_line(self):
+        return self.offset
+
+    @property
+    def max_line(self):
+        return self.offset + max(0, len(self.lines) - 1)
+
+    def get_raw_line(self, line_number):
+        index = line_number - self.offset
+        if not 0 <= index < len(self.lines):
+            return 0
+        return self.lined_buffer.self_to_raw.get(self.lines[index], 0)
+
+    def get_line_number(self, raw_line_number):
+        line_number = self.lined_buffer.raw_to_self.get(raw_line_number)
+        if line_number is None:
+            return None
+        return self.offset + min(bisect.bisect_left(self.lines, line_number), max(0, len(self.lines) - 1))
+
+
+class LineTimes:
+    BLOCK_LINES = 256
+
+    def __init__(self):
+        self.first_line = 0
+        # absolute time (ms) of the first line of each block, and per line ms offsets from its block start
+        self.block_starts = array("q")
+        self.offsets = array("I")
+        # the same layout for the line sequences that order lines across boxes
+        self.sequence_starts = array("q")
+        self.sequence_offsets = array("I")
+        self.last_time = 0
+
+    def add(self, raw_line, timestamp):
+        index = raw_line - self.first_line
+        if index < len(self.offsets):
+            return
+        ms = max(self.last_time, int(timestamp * 1000))
+        self.last_time = ms
+        sequence = next(LINE_SEQUENCE)
+        if index % self.BLOCK_LINES == 0:
+            self.block_starts.append(ms)
+            self.sequence_starts.append(sequence)
+        self.offsets.append(ms - self.block_starts[-1])
+        self.sequence_offsets.append(sequence - self.sequence_starts[-1])
+
+    def remove_before(self, raw_line):
+        blocks = (raw_line - self.first_line) // self.BLOCK_LINES
+        if blocks <= 0:
+            return
+        del self.block_starts[:blocks]
+        del self.offsets[: blocks * self.BLOCK_LINES]
+        del self.sequence_starts[:blocks]
+        del self.sequence_offsets[: blocks * self.BLOCK_LINES]
+        self.first_line += blocks * self.BLOCK_LINES
+
+    def get(self, raw_line):
+        return self._get(self.block_starts, self.offsets, raw_line)
+
+    def get_sequence(self, raw_line):
+        return self._get(self.sequence_starts, self.sequence_offsets, raw_line)
+
+    def find(self, ms):
+        return self._find(self.block_starts, self.offsets, ms)
+
+    def find_sequence(self, sequence):
+        return self._find(self.sequence_starts, self.sequence_offsets, sequence)
+
+    def _get(self, starts, offsets, raw_line):
+        index = raw_line - self.first_line
+        if not 0 <= index < len(offsets):
+            return None
+        return starts[index // self.BLOCK_LINES] + offsets[index]
+
+    def _find(self, starts, offsets, value):
+        # the first line with a value of at least value
+        block = bisect.bisect_left(starts, value)
+        if block:
+            lo = (block - 1) * self.BLOCK_LINES
+            hi = min(lo + self.BLOCK_LINES, len(offsets))
+            index = bisect.bisect_left(offsets, value - starts[block - 1], lo, hi)
+            if index < hi:
+                return self.first_line + index
+        return self.first_line + min(block * self.BLOCK_LINES, len(offsets))
+
+    def __len__(self):
+        return len(self.offsets)
+
+
 class CappedRawBuffer:
     def __init__(self, buffer_lines):
         self._deque = collections.deque(maxlen=buffer_lines + 1)
@@ -270,6 +651,23 @@ class CappedRawBuffer:
     def getvalue(self):
         return "\n".join(self._deque)
 
+    def chunks(self, size):
+        # the lines at the time of the call, joined into chunks of about size characters
+        lines = list(self._deque)
+        start = 0
+        length = 0
+        for end, line in enumerate(lines, 1):
+            length += len(line) + 1
+            if length >= size:
+                yield "\n".join(lines[start:end]) + ("\n" if end < len(lines) else "")
+                start = end
+                length = 0
+        if start < len(lines):
+            yield "\n".join(lines[start:])
+
+    def __len__(self):
+        return sum(len(line) for line in self._deque) + max(0, len(self._deque) - 1)
+
 
 class UncappedRawBuffer:
     def __init__(self):
@@ -287,20 +685,43 @@ class UncappedRawBuffer:
     def getvalue(self):
         return self._io.getvalue()
 
+    def chunks(self, size):
+        # the output at the time of the call, read back in chunks of size characters
+        end = self._io.tell()
+        for start in range(0, end, size):
+            self._io.seek(start)
+            chunk = self._io.read(min(size, end - start))
+            self._io.seek(0, io.SEEK_END)
+            yield chunk
+
+    def __len__(self):
+        return self._io.tell()
+
+
+def create_raw_buffer(buffer_lines):
+    return CappedRawBuffer(buffer_lines) if buffer_lines else UncappedRawBuffer()
+
 
 class Buffer:
     def __init__(self, width=None, buffer_lines=None):
         self.buffer_lines = buffer_lines
-        self.raw_buffer = CappedRawBuffer(buffer_lines) if buffer_lines else UncappedRawBuffer()
+        self.raw_buffer = create_raw_buffer(buffer_lines)
         self.raw_lines = 0
         self.lined_buffer = LinedBuffer()
         self.wrapping_buffer = self._new_wrapping_buffer(width)
+        self.search_index = SearchIndex()
+        self.line_filter = None
+        self.line_times = LineTimes()
+        # output written while a reflow is in progress, replayed into the new wrapping buffer before it is used
+        self.reflow_writes = None
 
     @staticmethod
     def _new_wrapping_buffer(width):
         return LinedBuffer(width or shutil.get_terminal_size().columns)
 
     def get_lines(self, lines, start_line, columns, start_column, wrap):
+        if self.line_filter:
+            return self.line_filter.get_lines(lines, start_line, columns, start_column)
         return self._get_buffer(wrap).get_lines(
             lines=lines,
             start_line=start_line,
@@ -308,9 +729,14 @@ class Buffer:
             start_column=start_column,
         )
 
-    def write(self, data, buffers=None, skip_raw=False):
+    def write(self, data, buffers=None, skip_raw=False, first_raw_line=None):
+        if self.reflow_writes is not None and not skip_raw:
+            self.reflow_writes.append((data, self.raw_lines))
         buffers = buffers or (self.lined_buffer, self.wrapping_buffer)
         lines = data.split("\n")
+        if first_raw_line is None:
+            first_raw_line = self.raw_lines - len(lines) + 1
+        now = time.time()
         for i, line in enumerate(lines):
             if not skip_raw:
                 if i:
@@ -321,8 +747,10 @@ class Buffer:
                 if i < len(lines) - 1:
                     self.raw_buffer.newline()
                 current_raw_line = self.raw_lines
+                if line or i < len(lines) - 1:
+                    self.line_times.add(current_raw_line, now)
             else:
-                current_raw_line = self.raw_lines - len(lines) + i + 1
+                current_raw_line = first_raw_line + i
             if i < len(lines) - 1:
                 maybe_slash_r = "" if line and line[-1] == "\r" else "\r"
                 line = f"{line}{maybe_slash_r}\n"
@@ -332,6 +760,8 @@ class Buffer:
                     buffer.raw_to_self[current_raw_line] = dirty_lines[0]
                     for dl in dirty_lines:
                         buffer.self_to_raw[dl] = current_raw_line
+                    if buffer is self.lined_buffer:
+                        self._update_indices(dirty_lines)
             if not skip_raw and self.buffer_lines:
                 lined_buffer = self.lined_buffer
                 wrapping_buffer = self.wrapping_buffer
@@ -339,30 +769,166 @@ class Buffer:
                 if total_lines > self.buffer_lines:
                     remove_lined = total_lines - self.buffer_lines
                     lined_buffer.min_line = lined_buffer.remove_lines(remove_lined, lined_buffer.min_line)
+                    self.search_index.remove_before(lined_buffer.min_line)
+                    if self.line_filter:
+                        self.line_filter.remove_before(lined_buffer.min_line)
+                    self.line_times.remove_before(lined_buffer.self_to_raw.get(lined_buffer.min_line, 0))
                     remove_wrapping = (
                         self.convert_line_number(lined_buffer.min_line, fail_on_error=True) - wrapping_buffer.min_line
                     )
                     wrapping_buffer.min_line = wrapping_buffer.remove_lines(remove_wrapping, wrapping_buffer.min_line)
 
+    def _update_indices(self, dirty_lines):
+        for line_number in dirty_lines:
+            text = self.lined_buffer.get_line_text(line_number)
+            self.search_index.add(line_number, text)
+            if self.line_filter:
+                self.line_filter.update(line_number, text)
+
+    def set_filter(self, pattern):
+        if not pattern:
+            self.line_filter = None
+            return
+        lined_buffer = self.lined_buffer
+        line_filter = LineFilter(pattern, lined_buffer)
+        line_filter.offset = lined_buffer.min_line
+        for line_number in self.search_index.candidate_lines(pattern, lined_buffer.min_line, lined_buffer.max_line):
+            line_filter.update(line_number, lined_buffer.get_line_text(line_number))
+        self.line_filter = line_filter
+
+    def search(self, pattern, start_raw_line=None, reverse=False, wrap_around=False):
+        for _, raw_line in self.search_steps(pattern, start_raw_line, reverse, wrap_around):
+            if raw_line is not None:
+                yield raw_line
+
+    def search_steps(self, pattern, start_raw_line=None, reverse=False, wrap_around=False):
+        # yields (progress, raw line) for every match and (progress, None) between chunks of scanned lines
+        regex = _compile_pattern(pattern)
+        lined_buffer = self.lined_buffer
+        min_line = lined_buffer.min_line
+        max_line = lined_buffer.max_line
+        start_line = None
+        if start_raw_line is not None:
+            start_line = lined_buffer.raw_to_self.get(start_raw_line)
+            if start_line is None:
+                # a start outside of the buffer leaves the first range empty, the wrap around covers all lines
+                before_start = start_raw_line < lined_buffer.self_to_raw.get(min_line, 0)
+                if reverse:
+                    start_line = min_line - 1 if before_start else max_line
+                else:
+                    start_line = min_line if before_start else max_line + 1
+            start_line = max(min_line - 1, min(max_line + 1, start_line))
+        if reverse:
+            ranges = [(min_line, max_line if start_line is None else start_line)]
+            if wrap_around and start_line is not None:
+                ranges.append((start_line + 1, max_line))
+        else:
+            ranges = [(min_line if start_line is None else start_line, max_line)]
+            if wrap_around and start_line is not None:
+                ranges.append((min_line, start_line - 1))
+        total_lines = max(1, max_line - min_line + 1)
+        scanned_lines = 0
+        candidates = 0
+        last_raw_line = None
+        for first_line, last_line in ranges:
+            range_start = last_line if reverse else first_line
+            for line_number in self.search_index.candidate_lines(pattern, first_line, last_line, reverse):
+                progress = (scanned_lines + abs(line_number - range_start)) / total_lines
+                candidates += 1
+                if candidates % SEARCH_CHUNK_LINES == 0:
+                    yield progress, None
+                # lines can be dropped by a capped buffer between chunks
+                if line_number < lined_buffer.min_line:
+                    continue
+                if not regex.search(lined_buffer.get_line_text(line_number)):
+                    continue
+                raw_line = lined_buffer.self_to_raw.get(line_number)
+                if raw_line is not None and raw_line != last_raw_line:
+                    last_raw_line = raw_line
+                    yield progress, raw_line
+            scanned_lines += max(0, last_line - first_line + 1)
+
+    def get_line_time(self, raw_line_number):
+        ms = self.line_times.get(raw_line_number)
+        return None if ms is None else ms / 1000
+
+    def find_time(self, timestamp):
+        return min(self.line_times.find(int(timestamp * 1000)), self.raw_lines)
+
     @property
     def width(self):
         return self.wrapping_buffer.width
 
     @width.setter
     def width(self, value):
-        self.wrapping_buffer = self._new_wrapping_buffer(value)
-        self.write(self.raw_buffer.getvalue(), skip_raw=True, buffers=[self.wrapping_buffer])
+        steps = self.reflow(value)
+        while True:
+            try:
+                next(steps)
+            except StopIteration as e:
+                self.wrapping_buffer = e.value
+                return
+
+    def reflow(self, width):
+        # builds a wrapping buffer for the new width a chunk of lines per iteration and returns it. the caller
+        # should start using it right away, output written later is only replayed into it until then
+        wrapping_buffer = self._new_wrapping_buffer(width)
+        self.reflow_writes = reflow_writes = []
+        try:
+            lines = self.raw_buffer.getvalue().split("\n")
+            first_raw_line = self.raw_lines - len(lines) + 1
+            for start in range(0, len(lines), REFLOW_CHUNK_LINES):
+                end = start + REFLOW_CHUNK_LINES
+                data = "\n".join(lines[start:end])
+                if end < len(lines):
+                    data = f"{data}\n"
+                self.write(data, skip_raw=True, buffers=[wrapping_buffer], first_raw_line=first_raw_line + start)
+                yield end / len(lines)
+            # catch up with output written in the meantime, yielding only while there is less of it each time
+            # so a box that keeps writing does not delay the end of the reflow forever
+            previous_lines = None
+            while reflow_writes:
+                writes = reflow_writes[:]
+                reflow_writes.clear()
+                for data, first_raw_line in writes:
+                    self.write(data, skip_raw=True, buffers=[wrapping_buffer], first_raw_line=first_raw_line)
+                lines = sum(data.count("\n") for data, _ in writes)
+                if previous_lines is None or lines < previous_lines:
+                    previous_lines = lines
+                    yield 1
+        finally:
+            self.reflow_writes = None
+        return wrapping_buffer
 
     def get_min_line(self, wrap):
+        if self.line_filter:
+            return self.line_filter.min_line
         return self._get_buffer(wrap).min_line
 
     def get_max_line(self, wrap):
+        if self.line_filter:
+            return self.line_filter.max_line
         return self._get_buffer(wrap).max_line
 
     def get_cursor(self, wrap):
         cursor = self._get_buffer(wrap).screen.cursor
         return cursor.x, cursor.y
 
+    def get_longest_line(self, start_line, end_line):
+        if self.line_filter:
+            return None
+        return self.lined_buffer.line_widths.query(start_line, end_line + 1)
+
+    def get_raw_line(self, line_number, wrap):
+        if self.line_filter:
+            return self.line_filter.get_raw_line(line_number)
+        return self._get_buffer(wrap).self_to_raw.get(line_number, 0)
+
+    def get_line_number(self, raw_line_number, wrap):
+        if self.line_filter:
+            return self.line_filter.get_line_number(raw_line_number)
+        return self._get_buffer(wrap).raw_to_self.get(raw_line_number)
+
     def _get_buffer(self, wrap):
         return self.wrapping_buffer if wrap else self.lined_buffer
 
@@ -1,3 +1,5 @@
+from datetime import datetime, timedelta
+
 from multiplex.keys import *
 
 from .exceptions import EndViewer
@@ -73,8 +75,60 @@ def strip_empty_lines(viewer):
 
 
 @bind(GLOBAL, "O", description="Dump boxes to output_dir (default: $PWD)")
-async def save(viewer):
-    await viewer.export.save()
+def save(viewer):
+    viewer.tasks.submit("save", viewer.export.save())
+
+
+@bind(GLOBAL, "/", description="Search for pattern in currently focused box")
+def search(viewer):
+    if viewer.help.show:
+        return
+    viewer.prompt.start("/", lambda v, pattern: v.focused.search(pattern))
+
+
+@bind(GLOBAL, "n", description="Jump to next search match in currently focused box")
+def search_next(viewer):
+    return viewer.focused.search_next()
+
+
+@bind(GLOBAL, "N", description="Jump to previous search match in currently focused box")
+def search_previous(viewer):
+    return viewer.focused.search_next(reverse=True)
+
+
+@bind(GLOBAL, "&", description="Show only lines matching pattern in currently focused box (empty pattern to reset)")
+def filter_lines(viewer):
+    if viewer.help.show:
+        return
+    viewer.prompt.start("&", lambda v, pattern: v.focused.filter(pattern))
+
+
+@bind(GLOBAL, "t", description="Jump to output of currently focused box at time (HH:MM[:SS])")
+def jump_to_time(viewer):
+    if viewer.help.show:
+        return
+    viewer.prompt.start("time: ", _jump_to_time)
+
+
+def _jump_to_time(viewer, text):
+    now = datetime.now()
+    for time_format in ("%H:%M:%S", "%H:%M"):
+        try:
+            parsed = datetime.strptime(text.strip(), time_format)
+            break
+        except ValueError:
+            pass
+    else:
+        return False
+    value = datetime.combine(now.date(), parsed.time())
+    if value > now:
+        value -= timedelta(days=1)
+    return viewer.focused.jump_to_time(value.timestamp())
+
+
+@bind(GLOBAL, "T", description="Show timeline of output from all boxes, ordered by arrival time")
+def show_timeline(viewer):
+    return viewer.show_timeline()
 
 
 @bind(GLOBAL, "?", description="Show/hide this help screen")
@@ -0,0 +1,102 @@
+import asyncio
+import collections
+
+# lower values are dispatched first
+INPUT = 0
+FOCUSED = 1
+VISIBLE = 2
+HIDDEN = 3
+PRIORITIES = (INPUT, FOCUSED, VISIBLE, HIDDEN)
+
+# an event that waited this long is dispatched before newer events of a higher priority (input excluded)
+MAX_WAIT = 0.05
+
+
+class PriorityDispatcher:
+    # merges a stream of sources like aiostream's flatten, but dispatches pending events by priority.
+    # each source has at most one pending event, so a flooding source is not read ahead of its consumption
+    def __init__(self, sources, get_priority, max_wait=MAX_WAIT):
+        self.sources = sources
+        self.get_priority = get_priority
+        self.max_wait = max_wait
+        self.queues = [collections.deque() for _ in PRIORITIES]
+        self.tasks = set()
+        self.ready = asyncio.Event()
+        self.error = None
+        self.loop = None
+
+    async def __aenter__(self):
+        self.loop = asyncio.get_running_loop()
+        self._start(self._pump_sources())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            if self.error:
+                raise self.error
+            entry = self._select()
+            if entry:
+                break
+            if not self.tasks:
+                raise StopAsyncIteration
+            self.ready.clear()
+            await self.ready.wait()
+        item, _, consumed = entry
+        if not consumed.done():
+            consumed.set_result(None)
+        return item
+
+    def _select(self):
+        input_queue = self.queues[INPUT]
+        if input_queue:
+            return input_queue.popleft()
+        queues = [queue for queue in self.queues if queue]
+        if not queues:
+            return None
+        # queues are ordered by arrival, so only their heads can be starved
+        oldest = min(queues, key=lambda queue: queue[0][1])
+        if self.loop.time() - oldest[0][1] >= self.max_wait:
+            return oldest.popleft()
+        return queues[0].popleft()
+
+    def _start(self, coroutine):
+        task = self.loop.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self._on_done)
+
+    def _on_done(self, task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            self.error = task.exception()
+        self.ready.set()
+
+    async def _pump_sources(self):
+        try:
+            async for source in self.sources:
+                self._start(self._pump(source))
+        finally:
+            await _close(self.sources)
+
+    async def _pump(self, source):
+        try:
+            async for item in source:
+                consumed = self.loop.create_future()
+                self.queues[self.get_priority(item)].append((item, self.loop.time(), consumed))
+                self.ready.set()
+                await consumed
+        finally:
+            await _close(source)
+
+
+async def _close(source):
+    aclose = getattr(source, "aclose", None)
+    if aclose:
+        await aclose()
@@ -7,12 +7,16 @@ import aiofiles
 from multiplex.ansi import C
 from multiplex.iterator import Descriptor
 
+# characters written to a box output file per save iteration
+SAVE_CHUNK_SIZE = 256 * 1024
+
 
 class Export:
     def __init__(self, viewer):
         self.viewer = viewer
 
-    async def save(self):
+    def save(self):
+        # a generator that writes a chunk per iteration, see TaskRunner
         viewer = self.viewer
         now = datetime.now()
         dir_name = f"output-{now.strftime('%Y-%m-%dT%H-%M-%S')}"
@@ -30,13 +34,21 @@ class Export:
             "boxes": [],
         }
         for index, holder in enumerate(holders):
+            if holder is viewer.timeline:
+                continue
             initial_title = holder.iterator.title
             state = holder.state
             title = initial_title.to_string(no_style=True) if isinstance(initial_title, C) else str(initial_title)
             title = "".join(c for c in title if c in valid_chars).lower()
             file_name = f"{str(index + 1).zfill(zero_padding)}-{title}"
-            async with aiofiles.open(os.path.join(output_dir, file_name), "w") as f:
-                await f.write(holder.buffer.raw_buffer.getvalue())
+            raw_buffer = holder.buffer.raw_buffer
+            total = max(1, len(raw_buffer))
+            written = 0
+            with open(os.path.join(output_dir, file_name), "w") as f:
+                for chunk in raw_buffer.chunks(SAVE_CHUNK_SIZE):
+                    f.write(chunk)
+                    written += len(chunk)
+                    yield (index + min(1, written / total)) / len(holders)
             metadata["boxes"].append(
                 {
                     "title": initial_title.to_dict() if isinstance(initial_title, C) else initial_title,
@@ -46,8 +58,8 @@ class Export:
                     "filename": file_name,
                 }
             )
-        async with aiofiles.open(os.path.join(output_dir, "metadata.json"), "w") as f:
-            await f.write(json.dumps(metadata, indent=2))
+        with open(os.path.join(output_dir, "metadata.json"), "w") as f:
+            f.write(json.dumps(metadata, indent=2))
         viewer.output_saved = True
         viewer.events.send_output_saved()
 
@@ -0,0 +1,139 @@
+import sys
+
+from multiplex import dispatcher
+from multiplex.actions import BoxAction, BoxActions, ToggleCollapse, ToggleWrap
+from multiplex.ansi import C
+from multiplex.buffer import create_raw_buffer
+from multiplex.exceptions import EndViewer
+from multiplex.refs import QUIT, SAVE, STREAM_DONE
+from multiplex.viewer import Viewer
+
+# actions that only affect how a box is displayed
+DISPLAY_ACTIONS = (ToggleCollapse, ToggleWrap)
+
+
+class StreamBuffer:
+    # keeps the raw output (for export) and writes complete lines to the output prefixed by the box title,
+    # without emulating a terminal
+    line_filter = None
+
+    def __init__(self, title, output, buffer_lines=None):
+        self.title = title.to_string(no_style=True) if isinstance(title, C) else str(title)
+        self.output = output
+        self.raw_buffer = create_raw_buffer(buffer_lines)
+        self.partial = ""
+
+    def write(self, data):
+        raw_lines = data.split("\n")
+        self.raw_buffer.write(raw_lines[0])
+        for line in raw_lines[1:]:
+            self.raw_buffer.newline()
+            self.raw_buffer.writeline(line)
+        lines = f"{self.partial}{data}".split("\n")
+        self.partial = lines.pop()
+        if lines:
+            self._write_lines(lines)
+
+    def close(self, exit_code=None):
+        lines = [self.partial] if self.partial else []
+        self.partial = ""
+        if exit_code is not None:
+            lines.append(f"exited with code {exit_code}")
+        if lines:
+            self._write_lines(lines)
+
+    def _write_lines(self, lines):
+        # a terminal would only show the text after the last carriage return of each line
+        prefix = f"[{self.title}] "
+        self.output.write("".join(f"{prefix}{line.rstrip(chr(13)).rsplit(chr(13), 1)[-1]}\n" for line in lines))
+
+
+class HeadlessViewer(Viewer):
+    def __init__(self, *args, output=None, **kwargs):
+        self.output = output or sys.stdout
+        self.active_streams = 0
+        self.flush_handle = None
+        super().__init__(*args, **kwargs)
+
+    def add(self, descriptor, thread_safe=False, redraw=True, num_boxes=None):
+        self.active_streams += 1
+        return super().add(descriptor, thread_safe=thread_safe, redraw=redraw, num_boxes=num_boxes)
+
+    def create_buffer(self, iterator):
+        return StreamBuffer(iterator.title, self.output, self.buffer_lines)
+
+    def _setup(self):
+        pass
+
+    @staticmethod
+    def restore():
+        pass
+
+    def _init(self):
+        pass
+
+    async def _sources(self):
+        yield self.events.receive()
+        while True:
+            item = await self.descriptors_queue.get()
+            source = await self._process_descriptor(item)
+            if source:
+                yield source
+            self.descriptors_queue.task_done()
+
+    def _get_event_priority(self, event):
+        # every stream is written to the output, none has focus
+        obj, _ = event
+        return dispatcher.VISIBLE if isinstance(obj, str) else dispatcher.INPUT
+
+    async def _handle_event(self, obj, output):
+        if obj is QUIT:
+            self._flush()
+            raise EndViewer
+        if obj is SAVE:
+            for _ in self.export.save():
+                pass
+        elif isinstance(obj, str):
+            holder = self.stream_id_to_holder[obj]
+            self._process_output(holder, output)
+            if output is STREAM_DONE:
+                self.active_streams -= 1
+                if not self.active_streams:
+                    self._flush()
+                    raise EndViewer
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        # events that are already pending are handled before the loop runs callbacks, so their output is flushed
+        # once for the whole batch
+        if not self.flush_handle:
+            self.flush_handle = self.loop.call_soon(self._flush)
+
+    def _flush(self):
+        if self.flush_handle:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        self.output.flush()
+
+    def _process_output(self, holder, data):
+        if data is None:
+            return
+        if isinstance(data, BoxAction):
+            self._run_action(holder, data)
+        elif callable(data):
+            data(holder)
+        elif data is STREAM_DONE:
+            holder.state.stream_done = True
+            holder.buffer.close(holder.iterator.metadata.get("exit_code"))
+        else:
+            holder.buffer.write(data)
+
+    def _run_action(self, holder, action):
+        if isinstance(action, BoxActions):
+            for inner_action in action.actions:
+                if isinstance(inner_action, BoxAction):
+                    self._run_action(holder, inner_action)
+                else:
+                    inner_action(holder)
+        elif not isinstance(action, DISPLAY_ACTIONS):
+            action.run(holder)
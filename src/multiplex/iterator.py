@@ -19,7 +19,7 @@ from multiplex.actions import SetTitle, BoxActions, UpdateMetadata
 from multiplex.ansi import C, theme
 from multiplex.controller import Controller
 from multiplex.process import Process
-from multiplex.refs import SPLIT, STOP
+from multiplex.refs import SPLIT, STOP, TIMELINE
 
 MULTIPLEX_SOCKET_PATH = "MULTIPLEX_SOCKET_PATH"
 MULTIPLEX_STREAM_ID = "MULTIPLEX_STREAM_ID"
@@ -337,4 +337,6 @@ async def _to_iterator(obj, title, context):
 async def to_iterator(obj, title=None, context=None) -> Iterator:
     if obj is SPLIT:
         return Iterator(SPLIT, title, "split", {})
+    if obj is TIMELINE:
+        return Iterator(TIMELINE, title, "timeline", {})
     return Iterator(*(await _to_iterator(obj, title, context or {})))
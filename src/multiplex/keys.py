@@ -97,6 +97,63 @@ descriptions = {
     GLOBAL: {},
 }
 
+# incremented on each bind so tries compiled from bindings can tell they are stale
+bindings_version = 0
+
+
+class _TrieNode:
+    __slots__ = ("children", "value")
+
+    def __init__(self):
+        self.children = {}
+        self.value = None
+
+
+class KeyTrie:
+    # matching a key sequence costs its length, regardless of the number of sequences in the trie
+    def __init__(self, items=()):
+        self.root = _TrieNode()
+        for seq, value in items:
+            self.add(seq, value)
+
+    def add(self, seq, value):
+        node = self.root
+        for key in seq:
+            child = node.children.get(key)
+            if child is None:
+                child = node.children[key] = _TrieNode()
+            node = child
+        node.value = value
+
+    def match(self, seq, start=0):
+        # returns the value of the shortest sequence that seq[start:] starts with, the index after it and
+        # whether seq[start:] is the beginning of a longer sequence when no such value exists
+        node = self.root
+        for index in range(start, len(seq)):
+            node = node.children.get(seq[index])
+            if node is None:
+                return None, start, False
+            if node.value is not None:
+                return node.value, index + 1, False
+        return None, start, len(seq) > start
+
+    def longest_match(self, seq, start=0):
+        node = self.root
+        result = None, start
+        for index in range(start, len(seq)):
+            node = node.children.get(seq[index])
+            if node is None:
+                break
+            if node.value is not None:
+                result = node.value, index + 1
+        return result
+
+
+def compile_bindings(used_bindings, mode):
+    # bindings of the mode take precedence over global bindings for the same sequence
+    items = [] if mode == INPUT else list(used_bindings[GLOBAL].items())
+    return KeyTrie(items + list(used_bindings[mode].items()))
+
 
 def generic_key_to_name(key):
     name = chr(key)
@@ -121,6 +178,22 @@ def seq_to_name(seq, fallback=True):
     return name
 
 
+NAMES = KeyTrie([*SEQ_TO_NAME.items(), *((seq, f"^{name}") for seq, name in CTRL_TO_NAME.items())])
+
+
+def seq_to_names(seq):
+    # splits seq into the longest sequences that have a name
+    names = []
+    start = 0
+    while start < len(seq):
+        name, end = NAMES.longest_match(seq, start)
+        if name is None:
+            name, end = generic_key_to_name(seq[start]), start + 1
+        names.append(name)
+        start = end
+    return names
+
+
 def is_multi(k):
     return isinstance(k, list) and isinstance(k[0], (list, tuple, str))
 
@@ -144,6 +217,8 @@ def bind(mode, *keys, description=None, custom_bindings=None, custom_description
     used_descriptions = custom_descriptions if custom_descriptions is not None else descriptions
 
     def wrapper(fn):
+        global bindings_version
+        bindings_version += 1
         description_keys = []
         for key in keys:
             if not is_multi(key):
@@ -1,15 +1,26 @@
 import asyncio
+import collections
 import functools
+import logging
 import os
+import re
 import sys
-import select
 import termios
 import tty
 
 from multiplex import keys as _keys
 
+logger = logging.getLogger("multiplex.keys_input")
+
 initial_stdin_settings = None
 
+# a paste of up to this many bytes is read at once
+READ_SIZE = 64 * 1024
+# bytes written to the input of a box before waiting for them to drain
+INPUT_CHUNK_SIZE = 4 * 1024
+# sent by the terminal around pasted text while bracketed paste is enabled
+PASTE_END = b"\x1b[201~"
+
 
 def setup():
     global initial_stdin_settings
@@ -21,8 +32,49 @@ def restore():
     termios.tcsetattr(sys.stdin, termios.TCSADRAIN, initial_stdin_settings)
 
 
-def _has_data():
-    return select.select([sys.stdin], [], [], 0) == ([sys.stdin], [], [])
+class TerminalReports:
+    # mode reports (DECRPM) sent by the terminal in response to queries, e.g. ESC [ ? 2026 ; 2 $ y
+    REPORT = re.compile(rb"\x1b\[\?(\d+);(\d+)\$y")
+    REPORT_PREFIX = re.compile(rb"\x1b(\[(\?(\d+(;(\d+\$?)?)?)?|2(0(0~?)?)?)?)?")
+    # focus events sent while focus reporting is enabled, ESC [ I on focus in and ESC [ O on focus out
+    FOCUS = re.compile(rb"\x1b\[([IO])")
+    PASTE_START = b"\x1b[200~"
+
+    def __init__(self, on_report, on_focus, on_paste_start=None):
+        self.on_report = on_report
+        self.on_focus = on_focus
+        self.on_paste_start = on_paste_start
+        self.buffer = b""
+
+    def feed(self, key):
+        if not self.buffer and key != b"\x1b":
+            return [key]
+        buffer = self.buffer + key
+        self.buffer = b""
+        match = self.REPORT.fullmatch(buffer)
+        if match:
+            self.on_report(int(match.group(1)), int(match.group(2)))
+            return []
+        match = self.FOCUS.fullmatch(buffer)
+        if match:
+            self.on_focus(match.group(1) == b"I")
+            return []
+        if buffer == self.PASTE_START and self.on_paste_start:
+            self.on_paste_start()
+            return []
+        if self.REPORT_PREFIX.fullmatch(buffer):
+            self.buffer = buffer
+            return []
+        return self._split(buffer)
+
+    def flush(self):
+        # reports arrive in one piece, a prefix left when no more input is available was typed by the user
+        buffer, self.buffer = self.buffer, b""
+        return self._split(buffer)
+
+    @staticmethod
+    def _split(buffer):
+        return [buffer[i : i + 1] for i in range(len(buffer))]
 
 
 class InputReader:
@@ -30,22 +82,55 @@ class InputReader:
         self.viewer = viewer
         self.bindings = bindings
         self.pending = []
+        self.tries = {}
+        self.tries_version = None
+        self.reports = TerminalReports(self._on_report, self._on_focus, self._on_paste_start)
+        # read from stdin but not processed yet
+        self.data = bytearray()
+        self.data_ready = asyncio.Event()
+        # text of a paste that did not end yet, and of one that ended but was not handled yet
+        self.paste = None
+        self.pasted = None
+        self.input_writes = collections.deque()
+        self.input_task = None
 
     async def read(self):
-        while True:
-            result = self._read_iteration()
-            if result is not None:
-                yield -1, result
-            await asyncio.sleep(0.02)
+        loop = asyncio.get_running_loop()
+        fd = sys.stdin.fileno()
+        loop.add_reader(fd, self._on_readable, fd)
+        try:
+            while True:
+                await self.data_ready.wait()
+                self.data_ready.clear()
+                # an iteration may stop before all data was processed, e.g. on backspace
+                while self.data:
+                    result = self._read_iteration()
+                    if result is not None:
+                        yield -1, result
+        finally:
+            loop.remove_reader(fd)
+
+    def _on_readable(self, fd):
+        data = os.read(fd, READ_SIZE)
+        if not data:
+            asyncio.get_running_loop().remove_reader(fd)
+            return
+        self.data.extend(data)
+        self.data_ready.set()
 
     def _read_iteration(self):
-        if not _has_data():
+        if not self.data:
             return None
         skip_process = False
+        is_prompt = self.viewer.prompt.show
         is_input = self.viewer.is_input_mode
         keys = []
-        while _has_data():
-            key = os.read(sys.stdin.fileno(), 1)
+        num_keys = 0
+        for key in self._read_keys():
+            num_keys += 1
+            if is_prompt:
+                keys.append(key)
+                continue
             key_ord = ord(key)
             if is_input:
                 keys.append(key)
@@ -55,28 +140,99 @@ class InputReader:
                 break
             else:
                 self.pending.append(key_ord)
+        pasted, self.pasted = self.pasted, None
+        if not num_keys and not pasted and self.paste is not None:
+            # only part of a paste was read
+            return None
+        if is_prompt:
+            result = [functools.partial(self._read_prompt_handler, keys)]
+            if pasted:
+                result.append(functools.partial(self._read_prompt_paste_handler, pasted))
+            return result
         if not skip_process:
             result, pending = self._process(self.pending)
             self.pending = pending
         else:
             result = []
         if is_input and keys:
-            result.append(functools.partial(self._read_input_handler, keys))
+            result.append(functools.partial(self._read_input_handler, b"".join(keys)))
+        if is_input and pasted:
+            result.append(functools.partial(self._read_input_handler, pasted))
         return result
 
-    @staticmethod
-    async def _read_input_handler(keys, viewer):
+    def _read_keys(self):
+        data = self.data
+        while data:
+            if self.paste is not None:
+                # the paste is taken as is, it is never interpreted as keys
+                paste = self.paste
+                search_start = max(0, len(paste) - len(PASTE_END) + 1)
+                paste.extend(data)
+                data.clear()
+                end = paste.find(PASTE_END, search_start)
+                if end == -1:
+                    return
+                data.extend(paste[end + len(PASTE_END) :])
+                self.pasted = bytes(paste[:end])
+                self.paste = None
+                # the iteration ends with the paste, keys after it are read by the next one
+                return
+            key = bytes(data[:1])
+            del data[:1]
+            yield from self.reports.feed(key)
+        yield from self.reports.flush()
+
+    def _on_paste_start(self):
+        self.paste = bytearray()
+
+    def _on_report(self, mode, value):
+        self.viewer.on_mode_report(mode, value)
+
+    def _on_focus(self, focused):
+        self.viewer.on_focus_change(focused)
+
+    def _read_input_handler(self, data, viewer):
         if not viewer.is_input_mode:
             return
         writer = viewer.focused.holder.iterator.metadata.get("input")
         if not writer:
             return
-        writer.write(b"".join(keys))
-        await writer.drain()
+        # written in the background, so output of the box keeps being read while it consumes a large paste
+        self.input_writes.append((writer, data))
+        if not self.input_task:
+            self.input_task = asyncio.get_running_loop().create_task(self._write_input())
+
+    async def _write_input(self):
+        try:
+            while self.input_writes:
+                writer, data = self.input_writes.popleft()
+                for start in range(0, len(data), INPUT_CHUNK_SIZE):
+                    writer.write(data[start : start + INPUT_CHUNK_SIZE])
+                    await writer.drain()
+        except (ConnectionError, RuntimeError) as e:
+            logger.warning(f"Failed writing input: {e}")
+            self.input_writes.clear()
+        finally:
+            self.input_task = None
+
+    async def cancel_input_writes(self):
+        self.input_writes.clear()
+        task = self.input_task
+        if task:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    @staticmethod
+    def _read_prompt_handler(keys, viewer):
+        return viewer.prompt.feed(b"".join(keys))
+
+    @staticmethod
+    def _read_prompt_paste_handler(pasted, viewer):
+        if viewer.prompt.show:
+            viewer.prompt.paste(pasted)
 
     def _process(self, keys):
         viewer = self.viewer
-        bindings = self.bindings
         if viewer.help.show:
             mode = _keys.HELP
         elif viewer.is_input_mode:
@@ -85,27 +241,26 @@ class InputReader:
             mode = _keys.SCROLL
         else:
             mode = _keys.NORMAL
-        sequences = [bindings[mode]]
-        if mode != _keys.INPUT:
-            sequences.append(bindings[_keys.GLOBAL])
+        trie = self._get_trie(mode)
 
         result = []
-        while keys:
-            has_pending = False
-            found_sequence = False
-            for mode_sequences in sequences:
-                for key_sequence, fn in mode_sequences.items():
-                    common_prefix = os.path.commonprefix([tuple(keys), key_sequence])
-                    if common_prefix:
-                        if len(common_prefix) == len(key_sequence):
-                            result.append(fn)
-                            keys = keys[len(key_sequence) :]
-                            found_sequence = True
-                            break
-                        elif list(key_sequence)[: len(keys)] == keys:
-                            has_pending = True
-            if has_pending:
+        start = 0
+        while start < len(keys):
+            fn, end, has_pending = trie.match(keys, start)
+            if fn:
+                result.append(fn)
+                start = end
+            elif has_pending:
                 break
-            if not found_sequence:
-                keys = keys[1:]
-        return result, keys
+            else:
+                start += 1
+        return result, keys[start:]
+
+    def _get_trie(self, mode):
+        if self.tries_version != _keys.bindings_version:
+            self.tries = {}
+            self.tries_version = _keys.bindings_version
+        trie = self.tries.get(mode)
+        if trie is None:
+            trie = self.tries[mode] = _keys.compile_bindings(self.bindings, mode)
+        return trie
@@ -0,0 +1,34 @@
+import bisect
+import itertools
+
+
+class LayoutIndex:
+    def __init__(self, viewer):
+        self.viewer = viewer
+        self._offsets = None
+
+    def invalidate(self):
+        self._offsets = None
+
+    @property
+    def offsets(self):
+        # offsets[i] is the view line of the title of box i, offsets[num_boxes] is the total number of view lines
+        if self._offsets is None:
+            heights = (1 if state.collapsed else 1 + state.box_height for state in self.viewer.states)
+            self._offsets = [0, *itertools.accumulate(heights)]
+        return self._offsets
+
+    @property
+    def total_lines(self):
+        return self.offsets[-1]
+
+    def get_title_line(self, index):
+        return self.offsets[index]
+
+    def get_visible_range(self, start_line, end_line):
+        # indices of boxes that have at least one view line in [start_line, end_line]
+        offsets = self.offsets
+        num_boxes = len(offsets) - 1
+        start = max(0, bisect.bisect_right(offsets, start_line) - 1)
+        end = min(num_boxes, bisect.bisect_right(offsets, end_line))
+        return range(start, end)
@@ -8,6 +8,7 @@ from multiplex.exceptions import IPCException
 from multiplex.ipc import Client, get_env_stream_id
 from multiplex.iterator import MULTIPLEX_SOCKET_PATH
 from multiplex.multiplex import Multiplex
+from multiplex import palette
 
 
 async def ipc_mode(socket_path, process, title, box_height, wait, load):
@@ -37,7 +38,22 @@ async def ipc_mode(socket_path, process, title, box_height, wait, load):
         await client.batch(actions)
 
 
-def direct_mode(process, title, verbose, box_height, auto_collapse, output_path, load, socket_path, buffer_lines):
+def direct_mode(
+    process,
+    title,
+    verbose,
+    box_height,
+    auto_collapse,
+    output_path,
+    load,
+    socket_path,
+    buffer_lines,
+    fps,
+    render_thread,
+    color_depth,
+    throttle,
+    headless,
+):
     multiplex = Multiplex(
         verbose=verbose,
         box_height=box_height[0],
@@ -45,6 +61,11 @@ def direct_mode(process, title, verbose, box_height, auto_collapse, output_path,
         output_path=output_path,
         socket_path=socket_path,
         buffer_lines=buffer_lines,
+        fps=fps,
+        render_thread=render_thread,
+        color_depth=color_depth,
+        throttle=throttle,
+        headless=headless,
     )
     for p, t, h in zip(process, cycle(title), cycle(box_height)):
         multiplex.add(p, title=t, box_height=h)
@@ -94,6 +115,38 @@ def validate(box_height, process, socket_path, title, wait, load):
     envvar="MULTIPLEX_BUFFER_LINES",
     help="By default, buffer length is unbounded. Use this to have a maximum number of lines for each " "buffer.",
 )
+@click.option(
+    "--fps",
+    type=int,
+    envvar="MULTIPLEX_FPS",
+    help="Maximum number of screen updates per second caused by output of boxes (default: 30).",
+)
+@click.option(
+    "--render-thread",
+    is_flag=True,
+    envvar="MULTIPLEX_RENDER_THREAD",
+    help="Diff and write screen updates on a separate thread so slow terminals do not delay reading output.",
+)
+@click.option(
+    "--color-depth",
+    type=click.Choice(palette.DEPTHS),
+    envvar="MULTIPLEX_COLOR_DEPTH",
+    help="Colors sent to the terminal are converted to this depth (default: detected from COLORTERM and TERM).",
+)
+@click.option(
+    "--throttle",
+    type=int,
+    envvar="MULTIPLEX_THROTTLE",
+    help="Boxes producing more lines per second than this are repainted only a few times per second while they "
+    "keep reading output at full speed. Use 0 to disable (default: 2000).",
+)
+@click.option(
+    "--headless",
+    is_flag=True,
+    envvar="MULTIPLEX_HEADLESS",
+    help="Stream the output of all processes to stdout as lines prefixed by their title instead of showing boxes. "
+    "Useful when there is no terminal, e.g. in CI.",
+)
 @click.option(
     "-a/-A",
     "--auto-collapse/--no-auto-collapse",
@@ -123,7 +176,22 @@ def validate(box_height, process, socket_path, title, wait, load):
 @click.version_option(None, "--version")
 @click.option("-v", "--verbose", is_flag=True)
 def main(
-    process, title, verbose, box_height, auto_collapse, output_path, wait, load, socket_path, buffer_lines, server
+    process,
+    title,
+    verbose,
+    box_height,
+    auto_collapse,
+    output_path,
+    wait,
+    load,
+    socket_path,
+    buffer_lines,
+    fps,
+    render_thread,
+    color_depth,
+    throttle,
+    headless,
+    server,
 ):
     validate(
         box_height=box_height,
@@ -163,6 +231,11 @@ def main(
             load=load,
             socket_path=socket_path,
             buffer_lines=buffer_lines,
+            fps=fps,
+            render_thread=render_thread,
+            color_depth=color_depth,
+            throttle=throttle,
+            headless=headless,
         )
 
 
@@ -2,6 +2,7 @@ import asyncio
 import os
 from typing import List
 
+from multiplex.headless import HeadlessViewer
 from multiplex.viewer import Viewer
 from multiplex.iterator import Descriptor
 from multiplex.ipc import Server
@@ -9,13 +10,29 @@ from multiplex.ipc import Server
 
 class Multiplex:
     def __init__(
-        self, verbose=False, box_height=None, auto_collapse=False, output_path=None, socket_path=None, buffer_lines=None
+        self,
+        verbose=False,
+        box_height=None,
+        auto_collapse=False,
+        output_path=None,
+        socket_path=None,
+        buffer_lines=None,
+        fps=None,
+        render_thread=False,
+        color_depth=None,
+        throttle=None,
+        headless=False,
     ):
         self.descriptors: List[Descriptor] = []
         self.verbose = verbose
         self.box_height = box_height
         self.auto_collapse = auto_collapse
         self.buffer_lines = buffer_lines
+        self.fps = fps
+        self.render_thread = render_thread
+        self.color_depth = color_depth
+        self.throttle = throttle
+        self.headless = headless
         self.output_path = output_path or os.getcwd()
         self.server = Server(socket_path)
         self.viewer: Viewer = None
@@ -30,7 +47,8 @@ class Multiplex:
 
     async def run_async(self, load=None):
         assert not self.viewer
-        self.viewer = Viewer(
+        viewer_cls = HeadlessViewer if self.headless else Viewer
+        self.viewer = viewer_cls(
             descriptors=self.descriptors,
             verbose=self.verbose,
             box_height=self.box_height,
@@ -38,6 +56,10 @@ class Multiplex:
             socket_path=self.server.socket_path,
             output_path=self.output_path,
             buffer_lines=self.buffer_lines,
+            fps=self.fps,
+            render_thread=self.render_thread,
+            color_depth=self.color_depth,
+            throttle=self.throttle,
         )
         if load:
             await self.viewer.load(load)
@@ -0,0 +1,89 @@
+import os
+
+TRUECOLOR = "truecolor"
+COLORS_256 = "256"
+COLORS_16 = "16"
+DEPTHS = (TRUECOLOR, COLORS_256, COLORS_16)
+
+FG_256 = 38
+BG_256 = 48
+
+CUBE_LEVELS = (0, 95, 135, 175, 215, 255)
+BASIC_COLORS = (
+    (0, 0, 0),
+    (205, 0, 0),
+    (0, 205, 0),
+    (205, 205, 0),
+    (0, 0, 238),
+    (205, 0, 205),
+    (0, 205, 205),
+    (229, 229, 229),
+    (127, 127, 127),
+    (255, 0, 0),
+    (0, 255, 0),
+    (255, 255, 0),
+    (92, 92, 255),
+    (255, 0, 255),
+    (0, 255, 255),
+    (255, 255, 255),
+)
+
+
+def detect_depth(environ=None):
+    environ = os.environ if environ is None else environ
+    if environ.get("COLORTERM", "").lower() in ("truecolor", "24bit"):
+        return TRUECOLOR
+    if "256color" in environ.get("TERM", ""):
+        return COLORS_256
+    return COLORS_16
+
+
+def _distance(color1, color2):
+    return sum((a - b) ** 2 for a, b in zip(color1, color2))
+
+
+def _index_to_rgb(index):
+    if index < 16:
+        return BASIC_COLORS[index]
+    if index < 232:
+        index -= 16
+        return CUBE_LEVELS[index // 36], CUBE_LEVELS[index // 6 % 6], CUBE_LEVELS[index % 6]
+    level = 8 + (index - 232) * 10
+    return level, level, level
+
+
+def _nearest(value, levels):
+    return min(range(len(levels)), key=lambda i: abs(levels[i] - value))
+
+
+# channel value -> nearest level of the 6x6x6 cube
+CUBE_INDEX = [_nearest(value, CUBE_LEVELS) for value in range(256)]
+# channel value -> nearest step of the 24 step grayscale ramp
+GRAY_INDEX = [min(23, max(0, round((value - 8) / 10))) for value in range(256)]
+# 256 color index -> nearest of the 16 basic colors
+BASIC_INDEX = [
+    index if index < 16 else min(range(16), key=lambda i: _distance(BASIC_COLORS[i], _index_to_rgb(index)))
+    for index in range(256)
+]
+
+
+def rgb_to_256(r, g, b):
+    cube = 16 + 36 * CUBE_INDEX[r] + 6 * CUBE_INDEX[g] + CUBE_INDEX[b]
+    gray = 232 + GRAY_INDEX[(r + g + b) // 3]
+    rgb = (r, g, b)
+    return cube if _distance(_index_to_rgb(cube), rgb) <= _distance(_index_to_rgb(gray), rgb) else gray
+
+
+def convert(codes, depth):
+    # codes is the SGR parameters of a single foreground or background color
+    if depth == TRUECOLOR or codes[0] not in (FG_256, BG_256):
+        return codes
+    if codes[1] == 2:
+        index = rgb_to_256(*codes[2:5])
+    else:
+        index = codes[2]
+    if depth == COLORS_256:
+        return codes[0], 5, index
+    index = BASIC_INDEX[index]
+    base = 30 if codes[0] == FG_256 else 40
+    return (base + index,) if index < 8 else (base + 60 + index - 8,)
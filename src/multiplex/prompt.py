@@ -0,0 +1,40 @@
+from multiplex import keys
+
+
+class PromptState:
+    def __init__(self, viewer):
+        self.viewer = viewer
+        self.show = False
+        self.prefix = ""
+        self.text = ""
+        self.callback = None
+
+    def start(self, prefix, callback):
+        self.show = True
+        self.prefix = prefix
+        self.text = ""
+        self.callback = callback
+
+    def feed(self, data):
+        for c in data.decode("utf-8", "ignore"):
+            key = ord(c)
+            if c in "\r\n":
+                return self._submit()
+            elif key == keys.ESC:
+                self.show = False
+                return
+            elif key in keys.BACKSPACE_OR_DEL:
+                self.text = self.text[:-1]
+            elif c.isprintable():
+                self.text += c
+
+    def paste(self, data):
+        self.text += "".join(c for c in data.decode("utf-8", "ignore") if c.isprintable())
+
+    def _submit(self):
+        self.show = False
+        return self.callback(self.viewer, self.text)
+
+    @property
+    def value(self):
+        return f"{self.prefix}{self.text}"
@@ -11,3 +11,4 @@ ALL_DOWN = obj("ALL_DOWN")
 SAVE = obj("SAVE")
 OUTPUT_SAVED = obj("OUTPUT_SAVED")
 STREAM_DONE = obj("STREM_DONE")
+TIMELINE = obj("TIMELINE")
@@ -1,12 +1,35 @@
 import signal
 
+# a resize is handled once the size did not change for this long, but at least this often while it keeps changing
+DEBOUNCE_DELAY = 0.1
+MAX_DELAY = 0.5
+
+handle = None
+first_time = None
+
 
 def setup(viewer_events, loop):
-    def sigwinch():
+    def redraw():
+        global handle, first_time
+        handle = first_time = None
         viewer_events.send_redraw()
 
+    def sigwinch():
+        global handle, first_time
+        now = loop.time()
+        if handle:
+            handle.cancel()
+        else:
+            first_time = now
+        delay = min(DEBOUNCE_DELAY, first_time + MAX_DELAY - now)
+        handle = loop.call_later(max(0.0, delay), redraw)
+
     loop.add_signal_handler(signal.SIGWINCH, sigwinch)
 
 
 def restore(loop):
+    global handle, first_time
     loop.remove_signal_handler(signal.SIGWINCH)
+    if handle:
+        handle.cancel()
+    handle = first_time = None
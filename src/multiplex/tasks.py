@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger("multiplex.tasks")
+
+# the longest a task runs before yielding to the event loop
+SLICE_DURATION = 0.005
+# short tasks the user waits for run before background tasks that were submitted earlier
+INTERACTIVE = 0
+BACKGROUND = 1
+
+
+class Task:
+    def __init__(self, name, steps, on_done, priority):
+        self.name = name
+        self.steps = steps
+        self.on_done = on_done
+        self.priority = priority
+        self.progress = 0
+
+
+class TaskRunner:
+    # runs tasks one after the other in slices between events, by priority and then in submission order. a task
+    # is a generator that does a small amount of work per iteration and yields its progress as a number between
+    # 0 and 1
+    def __init__(self, on_progress, slice_duration=SLICE_DURATION):
+        self.on_progress = on_progress
+        self.slice_duration = slice_duration
+        self.tasks = []
+        self.runner = None
+
+    @property
+    def status(self):
+        if not self.tasks:
+            return None
+        task = self.tasks[0]
+        return task.name, int(task.progress * 100)
+
+    def submit(self, name, steps, on_done=None, priority=BACKGROUND):
+        task = Task(name, steps, on_done, priority)
+        index = next((i for i, other in enumerate(self.tasks) if other.priority > priority), len(self.tasks))
+        self.tasks.insert(index, task)
+        if not self.runner:
+            self.runner = asyncio.get_event_loop().create_task(self._run())
+        return task
+
+    def cancel(self, task):
+        if task in self.tasks:
+            self.tasks.remove(task)
+            task.steps.close()
+
+    def cancel_all(self):
+        for task in list(self.tasks):
+            self.cancel(task)
+        if self.runner:
+            self.runner.cancel()
+            self.runner = None
+
+    async def _run(self):
+        while self.tasks:
+            task = self.tasks[0]
+            deadline = time.perf_counter() + self.slice_duration
+            try:
+                task.progress = next(task.steps)
+                while time.perf_counter() < deadline:
+                    task.progress = next(task.steps)
+            except StopIteration:
+                self.tasks.remove(task)
+                if task.on_done:
+                    task.on_done()
+            except Exception:
+                logger.exception(f"Task {task.name} failed")
+                self.tasks.remove(task)
+            self.on_progress()
+            await asyncio.sleep(0)
+        self.runner = None
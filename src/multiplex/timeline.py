@@ -0,0 +1,177 @@
+import heapq
+import logging
+from itertools import islice
+
+from multiplex.buffer import SEARCH_CHUNK_LINES, _compile_pattern
+
+logger = logging.getLogger("multiplex.timeline")
+
+
+class TimelineBuffer:
+    line_filter = None
+
+    def __init__(self, viewer):
+        self.viewer = viewer
+
+    def _sources(self):
+        result = []
+        for holder in self.viewer.holders:
+            buffer = holder.buffer
+            if isinstance(buffer, TimelineBuffer):
+                continue
+            line_times = buffer.line_times
+            lined_buffer = buffer.lined_buffer
+            start = max(line_times.first_line, lined_buffer.self_to_raw.get(lined_buffer.min_line, 0))
+            end = line_times.first_line + len(line_times)
+            if start < end:
+                result.append((holder.index, buffer, start, end))
+        return result
+
+    @staticmethod
+    def _find(source, sequence):
+        _, buffer, start, end = source
+        return max(start, min(end, buffer.line_times.find_sequence(sequence)))
+
+    def _count_before(self, sources, sequence):
+        return sum(self._find(source, sequence) - source[2] for source in sources)
+
+    def _merge(self, sources, sequence):
+        heap = []
+        for source in sources:
+            raw_line = self._find(source, sequence)
+            if raw_line < source[3]:
+                heap.append((source[1].line_times.get_sequence(raw_line), raw_line, source))
+        heapq.heapify(heap)
+        while heap:
+            _, raw_line, source = heap[0]
+            yield source, raw_line
+            raw_line += 1
+            if raw_line < source[3]:
+                heapq.heapreplace(heap, (source[1].line_times.get_sequence(raw_line), raw_line, source))
+            else:
+                heapq.heappop(heap)
+
+    def _iter_from(self, sources, position):
+        # largest sequence such that less than position lines arrived before it
+        low = min(source[1].line_times.get_sequence(source[2]) for source in sources)
+        high = max(source[1].line_times.get_sequence(source[3] - 1) for source in sources) + 1
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self._count_before(sources, mid) <= position:
+                low = mid
+            else:
+                high = mid - 1
+        skip = position - self._count_before(sources, low)
+        return islice(self._merge(sources, low), skip, None)
+
+    def get_lines(self, lines, start_line, columns, start_column, wrap):
+        sources = self._sources()
+        if not sources:
+            return []
+        digits = len(str(self.viewer.num_boxes))
+        result = []
+        for source, raw_line in islice(self._iter_from(sources, start_line), lines):
+            index, buffer, _, _ = source
+            prefix = f"[{str(index + 1).rjust(digits)}] "
+            width = max(0, columns - len(prefix))
+            line_number = buffer.lined_buffer.raw_to_self.get(raw_line)
+            if line_number is None:
+                line_length, line = 0, " " * width
+            else:
+                ((line_length, line),) = buffer.lined_buffer.get_lines_at([line_number], width, start_column)
+            result.append((len(prefix) + line_length, f"{prefix}{line}"))
+        return result
+
+    @property
+    def raw_lines(self):
+        return sum(end - start for _, _, start, end in self._sources())
+
+    def get_min_line(self, wrap):
+        return 0
+
+    def get_max_line(self, wrap):
+        return max(0, self.raw_lines - 1)
+
+    def get_cursor(self, wrap):
+        return 0, 0
+
+    def get_longest_line(self, start_line, end_line):
+        return None
+
+    def get_raw_line(self, line_number, wrap):
+        return line_number
+
+    def get_line_number(self, raw_line_number, wrap):
+        return raw_line_number
+
+    def convert_line_number(self, line_number, from_wrapped=False, fail_on_error=False):
+        return line_number
+
+    def find_time(self, timestamp):
+        ms = int(timestamp * 1000)
+        return sum(
+            max(start, min(end, buffer.line_times.find(ms))) - start for _, buffer, start, end in self._sources()
+        )
+
+    def search(self, pattern, start_raw_line=None, reverse=False, wrap_around=False):
+        for _, raw_line in self.search_steps(pattern, start_raw_line, reverse, wrap_around):
+            if raw_line is not None:
+                yield raw_line
+
+    def search_steps(self, pattern, start_raw_line=None, reverse=False, wrap_around=False):
+        # the merged lines are scanned forward, matches of a reverse search are yielded at the end of each range
+        regex = _compile_pattern(pattern)
+        sources = self._sources()
+        total_lines = sum(end - start for _, _, start, end in sources)
+        if not total_lines:
+            return
+        max_line = total_lines - 1
+        start_line = None if start_raw_line is None else max(-1, min(total_lines, start_raw_line))
+        if reverse:
+            ranges = [(0, max_line if start_line is None else start_line)]
+            if wrap_around and start_line is not None:
+                ranges.append((start_line + 1, max_line))
+        else:
+            ranges = [(0 if start_line is None else start_line, max_line)]
+            if wrap_around and start_line is not None:
+                ranges.append((0, start_line - 1))
+        scanned_lines = 0
+        for first_line, last_line in ranges:
+            first_line = max(0, first_line)
+            if first_line > last_line:
+                continue
+            matches = []
+            merged = islice(self._iter_from(sources, first_line), last_line - first_line + 1)
+            for line_number, (source, raw_line) in enumerate(merged, first_line):
+                scanned_lines += 1
+                progress = scanned_lines / total_lines
+                if scanned_lines % SEARCH_CHUNK_LINES == 0:
+                    yield progress, None
+                lined_buffer = source[1].lined_buffer
+                self_line = lined_buffer.raw_to_self.get(raw_line)
+                # lines can be dropped by a capped buffer between chunks
+                if self_line is None or not regex.search(lined_buffer.get_line_text(self_line)):
+                    continue
+                if reverse:
+                    matches.append(line_number)
+                else:
+                    yield progress, line_number
+            for line_number in reversed(matches):
+                yield scanned_lines / total_lines, line_number
+
+    def set_filter(self, pattern):
+        if pattern:
+            logger.warning("Filtering is not supported in the timeline")
+
+    @property
+    def width(self):
+        return self.viewer.cols
+
+    @width.setter
+    def width(self, value):
+        pass
+
+    def reflow(self, width):
+        # rendered from the other buffers at the current width, there is nothing to rebuild
+        return None
+        yield
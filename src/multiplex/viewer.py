@@ -5,26 +5,36 @@ import uuid
 from dataclasses import dataclass
 from typing import Any
 
-import aiostream
-
 from multiplex import ansi, to_iterator
+from multiplex import dispatcher
 from multiplex import keys
 from multiplex import keys_input
+from multiplex import palette
 from multiplex import resize
+from multiplex import writer
 from multiplex import commands
 from multiplex.actions import BoxAction
 from multiplex.ansi import C, NONE
 from multiplex.box import BoxHolder
+from multiplex.buffer import Buffer
 from multiplex.enums import ViewLocation, BoxLine
 from multiplex.exceptions import EndViewer
 from multiplex.export import Export
 from multiplex.help import HelpViewState
 from multiplex.iterator import Descriptor
-from multiplex.refs import REDRAW, RECALC, SPLIT, QUIT, ALL_DOWN, OUTPUT_SAVED, SAVE, STREAM_DONE
+from multiplex.layout import LayoutIndex
+from multiplex.prompt import PromptState
+from multiplex.timeline import TimelineBuffer
+from multiplex.tasks import TaskRunner
+from multiplex.refs import REDRAW, RECALC, SPLIT, QUIT, ALL_DOWN, OUTPUT_SAVED, SAVE, STREAM_DONE, TIMELINE
 
 logger = logging.getLogger("multiplex.view")
 
 MIN_BOX_HEIGHT = 7
+DEFAULT_FPS = 30
+DEFAULT_THROTTLE = 2000
+# repaints per second of boxes that produce more lines per second than the throttle threshold
+THROTTLED_FPS = 4
 
 
 class ViewerEvents:
@@ -67,16 +77,33 @@ class DescriptorQueueItem:
 
 
 class Viewer:
-    def __init__(self, descriptors, box_height, auto_collapse, verbose, socket_path, output_path, buffer_lines):
+    def __init__(
+        self,
+        descriptors,
+        box_height,
+        auto_collapse,
+        verbose,
+        socket_path,
+        output_path,
+        buffer_lines,
+        fps=None,
+        render_thread=False,
+        color_depth=None,
+        throttle=None,
+    ):
         self.holders = []
+        self.layout = LayoutIndex(self)
+        self.timeline = None
         self.stream_id_to_holder = {}
         self.holder_to_stream_id = {}
         self.loop = asyncio.get_event_loop()
         self.input_reader = keys_input.InputReader(viewer=self, bindings=keys.bindings)
         self.descriptors_queue: "asyncio.Queue[DescriptorQueueItem]" = asyncio.Queue()
         self.help = HelpViewState(self)
+        self.prompt = PromptState(self)
         self.events = ViewerEvents()
         self.export = Export(self)
+        self.tasks = TaskRunner(self._on_task_progress)
         self.box_height = box_height
         self.auto_collapse = auto_collapse
         self.buffer_lines = buffer_lines
@@ -92,6 +119,26 @@ class Viewer:
         self.lines = None
         self.stopped = False
         self.output_saved = False
+        self.frame_interval = 1 / (fps or DEFAULT_FPS)
+        self.render_thread = render_thread
+        self.color_depth = color_depth or palette.detect_depth()
+        self.throttle = DEFAULT_THROTTLE if throttle is None else throttle
+        self.throttled_boxes = set()
+        self.throttle_refresh_handle = None
+        self.frame_handle = None
+        self.reflow_task = None
+        self.frame_deferred = False
+        self.terminal_focused = True
+        self.last_frame_time = 0
+        self.dirty_boxes = set()
+        self.dirty_titles = set()
+        self.dirty_status_bar = False
+        self.dirty_view = False
+        self.dirty_layout = False
+        self.dirty_clear = False
+        self.painted_layout = {}
+        self.title_cache = {}
+        self.status_bar_cache = None
         self.initial_add(descriptors)
 
     def initial_add(self, descriptors):
@@ -133,6 +180,18 @@ class Viewer:
     async def load(self, export_dir):
         await self.export.load(export_dir)
 
+    def create_buffer(self, iterator):
+        if iterator.iterator is TIMELINE:
+            return TimelineBuffer(self)
+        return Buffer(buffer_lines=self.buffer_lines)
+
+    def show_timeline(self):
+        if self.timeline:
+            self.current_focused_box = self.timeline.index
+            self.verify_focused_box_in_view()
+            return
+        self.add(Descriptor(TIMELINE, title="timeline", box_height=None, wrap=False, scroll_down=True))
+
     def swap_indices(self, index1, index2):
         holder1 = self.get_holder(index1)
         holder2 = self.get_holder(index2)
@@ -140,6 +199,7 @@ class Viewer:
         self.holders[index2] = holder1
         holder1.index = index2
         holder2.index = index1
+        self.layout.invalidate()
         if self.current_focused_box == index1:
             self.current_focused_box = index2
         elif self.current_focused_box == index2:
@@ -185,6 +245,10 @@ class Viewer:
             self._setup()
             await self._main()
         finally:
+            if self.frame_handle:
+                self.frame_handle.cancel()
+            self.tasks.cancel_all()
+            await self.input_reader.cancel_input_writes()
             self.restore()
             self.stopped = True
 
@@ -193,6 +257,11 @@ class Viewer:
         keys_input.setup()
         resize_notifier = resize.setup(self.events, loop)
         ansi.setup()
+        ansi.set_color_depth(self.color_depth)
+        if self.render_thread:
+            ansi.start_render_thread()
+        else:
+            writer.setup(loop, self._on_output_drained)
         return resize_notifier
 
     @staticmethod
@@ -200,11 +269,12 @@ class Viewer:
         loop = asyncio.get_event_loop()
         keys_input.restore()
         resize.restore(loop)
+        writer.restore()
         ansi.restore()
 
     async def _main(self):
         self._init()
-        async with aiostream.stream.advanced.flatten(self._sources()).stream() as streamer:
+        async with dispatcher.PriorityDispatcher(self._sources(), self._get_event_priority) as streamer:
             async for obj, output in streamer:
                 try:
                     await self._handle_event(obj, output)
@@ -221,6 +291,22 @@ class Viewer:
                 yield source
             self.descriptors_queue.task_done()
 
+    def _get_event_priority(self, event):
+        obj, _ = event
+        if not isinstance(obj, str):
+            return dispatcher.INPUT
+        holder = self.stream_id_to_holder.get(obj)
+        if holder is None:
+            return dispatcher.HIDDEN
+        return self._get_box_priority(holder)
+
+    def _get_box_priority(self, holder):
+        if holder.index == self.current_focused_box:
+            return dispatcher.FOCUSED
+        if holder.box.is_visible:
+            return dispatcher.VISIBLE
+        return dispatcher.HIDDEN
+
     async def _process_descriptor(self, descriptor_queue_item):
         descriptor = descriptor_queue_item.descriptor
         redraw = descriptor_queue_item.redraw
@@ -246,7 +332,11 @@ class Viewer:
             state.wrap = descriptor.wrap
         if descriptor.collapsed is not None:
             state.collapsed = descriptor.collapsed
+        if state.box_height is None:
+            # provisional until the pending redraw/recalc event sets the default height
+            state.box_height = MIN_BOX_HEIGHT
         self.holders.append(holder)
+        self.layout.invalidate()
         if redraw:
             self.events.send_redraw()
         else:
@@ -262,7 +352,9 @@ class Viewer:
             stream_id = self.holder_to_stream_id.pop(id(previous_holder))
         self.holder_to_stream_id[id(holder)] = stream_id
         self.stream_id_to_holder[stream_id] = holder
-        if iterator.iterator is not SPLIT:
+        if iterator.iterator is TIMELINE:
+            self.timeline = holder
+        elif iterator.iterator is not SPLIT:
             return self._wrapped_iterator(stream_id, iterator.iterator)
 
     @staticmethod
@@ -272,22 +364,49 @@ class Viewer:
         yield stream_id, STREAM_DONE
 
     def _init(self):
-        changed_cols, _ = self._update_lines_cols()
+        changed_cols, changed_lines = self._update_lines_cols()
         if not self.holders:
             return
-        ansi.clear()
         self._update_holders(changed_cols=changed_cols)
-        self._update_view()
-        ansi.flush()
+        if changed_cols or changed_lines:
+            self.mark_view(clear=True)
+        else:
+            self.mark_layout()
+        self._render_frame()
 
     def _update_holders(self, num_boxes=None, changed_cols=None):
         num_boxes = num_boxes or self.num_boxes
         default_box_height = max(MIN_BOX_HEIGHT, (self.lines - num_boxes - 1) // num_boxes)
         for holder in self.holders:
-            if changed_cols:
-                holder.box.set_width(self.cols)
             if not holder.state.changed_height:
                 holder.state.box_height = default_box_height
+        if changed_cols:
+            self._reflow_boxes()
+
+    def _reflow_boxes(self):
+        # the focused box is reflowed before the next frame, the others in slices between events with hidden
+        # boxes last
+        if self.reflow_task:
+            self.tasks.cancel(self.reflow_task)
+            self.reflow_task = None
+        holders = sorted(self.holders, key=self._get_box_priority)
+        if holders and self._get_box_priority(holders[0]) == dispatcher.FOCUSED:
+            focused = holders.pop(0)
+            for _ in focused.box.reflow(self.cols):
+                pass
+        if holders:
+            self.reflow_task = self.tasks.submit("reflow", self._reflow(holders, self.cols))
+
+    def _reflow(self, holders, cols):
+        for i, holder in enumerate(holders):
+            for progress in holder.box.reflow(cols):
+                yield (i + progress) / len(holders)
+            self.mark_box(holder)
+        self.reflow_task = None
+
+    def _on_task_progress(self):
+        self.dirty_status_bar = True
+        self._schedule_frame()
 
     def _update_lines_cols(self):
         cols, lines = ansi.get_size()
@@ -312,24 +431,29 @@ class Viewer:
             raise EndViewer
 
         if obj is SAVE:
-            await commands.save(self)
-            self._update_status_bar()
+            commands.save(self)
+            self.dirty_status_bar = True
         elif obj is OUTPUT_SAVED:
             await asyncio.sleep(0.1)
             self.output_saved = False
-            self._update_status_bar()
+            self.dirty_status_bar = True
         elif obj is ALL_DOWN:
             commands.all_down(self)
-            ansi.clear()
-            self._update_view()
+            self.mark_layout()
         elif isinstance(obj, str):
             holder = self.stream_id_to_holder[obj]
-            self._update_box(holder.index, output)
+            self._process_output(holder, output)
+            if isinstance(output, BoxAction) and not output.changes_box:
+                self.mark_title(holder)
+                self._schedule_frame()
+                return
+            self.mark_box(holder)
+            if isinstance(output, str) and self.timeline:
+                self.mark_box(self.timeline)
             if isinstance(output, BoxAction) or callable(output) or output is STREAM_DONE:
-                ansi.clear()
-                self._update_view()
-            if self.is_input_mode:
-                self._update_cursor()
+                self.mark_layout()
+            self._schedule_frame()
+            return
         else:
             key_changed = False
             boxes_changed = set()
@@ -343,38 +467,155 @@ class Viewer:
                     boxes_changed.add(current_key_changed)
                 else:
                     key_changed = key_changed or current_key_changed
-            if full_refresh:
-                ansi.clear()
             if key_changed:
-                self._update_view()
+                self.mark_view(clear=full_refresh)
             elif boxes_changed:
-                self._update_status_bar()
+                self.dirty_status_bar = True
                 for index in boxes_changed:
-                    self._update_box(index, data=None)
+                    self.mark_box(self.get_holder(index))
             elif not self.is_input_mode:
-                self._update_status_bar()
+                self.dirty_status_bar = True
+        # key presses and control events skip the frame scheduler so they are never delayed
+        self._render_frame()
+
+    def mark_box(self, holder):
+        self.dirty_boxes.add(holder)
+
+    def mark_title(self, holder):
+        self.dirty_titles.add(holder)
+        if holder.index == self.current_focused_box:
+            # the status bar shows the title of the focused box
+            self.dirty_status_bar = True
+
+    def mark_view(self, clear=False):
+        self.dirty_view = True
+        self.dirty_clear = self.dirty_clear or clear
+
+    def mark_layout(self):
+        self.dirty_layout = True
+
+    def _schedule_frame(self, min_delay=0.0):
+        now = self.loop.time()
+        when = now + max(min_delay, self.last_frame_time + self.frame_interval - now)
+        if self.frame_handle:
+            # a later frame booked for a throttled box must not hold back frames of other boxes
+            if self.frame_handle.when() <= when:
+                return
+            self.frame_handle.cancel()
+        self.frame_handle = self.loop.call_at(when, self._render_frame)
+
+    def _render_frame(self):
+        if self.frame_handle:
+            self.frame_handle.cancel()
+            self.frame_handle = None
+        if not self.terminal_focused:
+            # nobody sees the frames, a full repaint follows when the terminal is focused again
+            return
+        if writer.is_busy():
+            # the terminal is behind, render the latest state once it catches up
+            self.frame_deferred = True
+            return
+        now = self.last_frame_time = self.loop.time()
+        deferred = set()
+        if self.dirty_clear:
+            ansi.clear()
+        if self.dirty_view:
+            self._update_view()
+        else:
+            deferred = {holder for holder in self.dirty_boxes if self._is_paint_deferred(holder, now)}
+            self.dirty_boxes -= deferred
+            if self.dirty_layout:
+                self._update_layout()
+            else:
+                if self.dirty_status_bar:
+                    self._update_status_bar()
+                for holder in self.dirty_boxes:
+                    self._update_box(holder.index)
+                for holder in self.dirty_titles - self.dirty_boxes:
+                    self._update_title_line(holder.index)
+                self._update_cursor()
+        self.dirty_boxes = deferred
+        self.dirty_titles = set()
+        self.dirty_status_bar = False
+        self.dirty_view = False
+        self.dirty_layout = False
+        self.dirty_clear = False
         ansi.flush()
+        if deferred:
+            next_paint_time = min(holder.last_paint_time for holder in deferred) + 1 / THROTTLED_FPS
+            self._schedule_frame(min_delay=next_paint_time - now)
+        if self.throttled_boxes and not self.throttle_refresh_handle:
+            # keeps the rate indicator of throttled boxes current, also after they stop producing output
+            self.throttle_refresh_handle = self.loop.call_later(1, self._refresh_throttled_boxes)
+
+    def _refresh_throttled_boxes(self):
+        self.throttle_refresh_handle = None
+        for holder in self.throttled_boxes:
+            self.mark_box(holder)
+        self._schedule_frame()
+
+    def _get_throttled_rate(self, holder, now):
+        if not self.throttle:
+            return None
+        rate = holder.line_rate.rate(now)
+        return int(rate) if rate > self.throttle else None
+
+    def _is_paint_deferred(self, holder, now):
+        if now - holder.last_paint_time >= 1 / THROTTLED_FPS:
+            return False
+        return self._get_throttled_rate(holder, now) is not None
+
+    def on_mode_report(self, mode, value):
+        if mode == ansi.SYNCHRONIZED_UPDATE_MODE:
+            # 1 and 2 mean the mode is supported and currently set or reset
+            ansi.set_synchronized_output(value in (1, 2))
+
+    def on_focus_change(self, focused):
+        if focused == self.terminal_focused:
+            return
+        self.terminal_focused = focused
+        if focused:
+            ansi.invalidate()
+            self.mark_view()
+
+    def _on_output_drained(self):
+        if self.frame_deferred:
+            self.frame_deferred = False
+            self._render_frame()
+
+    def _process_output(self, holder, data):
+        if data is None:
+            return
+        if isinstance(data, BoxAction):
+            data.run(holder)
+        elif callable(data):
+            data(holder)
+        elif data is STREAM_DONE:
+            if holder.state.auto_scroll:
+                # frames are rendered lazily so the box may not have been scrolled to its end yet
+                holder.box.move_all_down()
+            holder.state.stream_done = True
+            if self.auto_collapse and not holder.iterator.metadata.get("exit_code"):
+                holder.box.toggle_collapse(value=True)
+            holder.box.exit_input_mode()
+        else:
+            holder.line_rate.add(data.count("\n"), self.loop.time())
+            holder.buffer.write(data)
 
-    def _update_box(self, i, data):
-        if data is not None:
-            holder = self.get_holder(i)
-            if isinstance(data, BoxAction):
-                data.run(holder)
-            elif callable(data):
-                data(holder)
-            elif data is STREAM_DONE:
-                holder.state.stream_done = True
-                if self.auto_collapse and not holder.iterator.metadata.get("exit_code"):
-                    holder.box.toggle_collapse(value=True)
-                holder.box.exit_input_mode()
-            else:
-                holder.buffer.write(data)
+    def _update_box(self, i):
         if self.help.show:
             return
         self._update_title_line(i)
-        box = self.get_box(i)
-        if box.is_visible:
-            box.update()
+        self._update_box_text(i)
+
+    def _update_box_text(self, i):
+        holder = self.get_holder(i)
+        if holder.box.is_visible:
+            self.painted_layout[holder] = self._get_box_layout(i)
+            holder.last_paint_time = self.loop.time()
+            holder.box.update()
+        else:
+            self.painted_layout.pop(holder, None)
 
     async def _process_key_handler(self, fn):
         prev_current_line = self.current_view_line
@@ -399,24 +640,49 @@ class Viewer:
                 descriptions=keys.descriptions,
             )
         else:
+            self.painted_layout = {}
             self._update_status_bar()
             self._update_title_lines()
             self._update_boxes()
+            self._update_empty_lines()
             self._update_cursor()
 
+    def _update_layout(self):
+        if self.help.show:
+            return
+        # title rows are always rendered (unchanged rows are not written), box content is only rendered
+        # for boxes that moved, were resized or received output
+        self._update_status_bar()
+        self._update_title_lines()
+        painted_layout = self.painted_layout
+        self.painted_layout = {}
+        for i in self.visible_indices:
+            holder = self.get_holder(i)
+            if painted_layout.get(holder) != self._get_box_layout(i) or holder in self.dirty_boxes:
+                self._update_box_text(i)
+            else:
+                self.painted_layout[holder] = painted_layout[holder]
+        self._update_empty_lines()
+        self._update_cursor()
+
     def _update_boxes(self):
+        for i in self.visible_indices:
+            self._update_box(i)
+
+    def _update_empty_lines(self):
         if self.maximized:
-            self._update_box(self.current_focused_box, data=None)
-        else:
-            for i in range(self.num_boxes):
-                self._update_box(i, data=None)
+            return
+        from_row = max(0, self.layout.total_lines - self.current_view_line)
+        to_row = self.get_max_box_line()
+        if from_row <= to_row:
+            ansi.text_box(from_row=from_row, to_row=to_row, lines=[])
+
+    def _get_box_layout(self, index):
+        return self.get_box_top_line(index), self.get_box_bottom_line(index)
 
     def _update_title_lines(self):
-        if self.maximized:
-            self._update_title_line(self.current_focused_box)
-        else:
-            for i in range(self.num_boxes):
-                self._update_title_line(i)
+        for i in self.visible_indices:
+            self._update_title_line(i)
 
     def _update_title_line(self, index):
         screen_y, location = self.get_title_line(index)
@@ -424,91 +690,129 @@ class Viewer:
             return
 
         holder = self.get_holder(index)
-        iterator = holder.iterator
+        title = holder.iterator.title
         box_state = holder.state
-        suffix = ""
+        verbose_state = None
         if self.verbose:
-            wrap = box_state.wrap
-            auto_scroll = box_state.auto_scroll
-            collapsed = box_state.collapsed
-            input_mode = box_state.input_mode
-            buffer_line = box_state.buffer_start_line
-            box_height = box_state.box_height
+            verbose_state = (
+                box_state.wrap,
+                box_state.auto_scroll,
+                box_state.collapsed,
+                box_state.input_mode,
+                bool(holder.buffer.line_filter),
+                box_state.buffer_start_line,
+                box_state.box_height,
+            )
+        throttled_rate = self._get_throttled_rate(holder, self.loop.time())
+        if throttled_rate is None:
+            self.throttled_boxes.discard(holder)
+        else:
+            self.throttled_boxes.add(holder)
+        key = (index == self.current_focused_box, box_state.stream_done, self.cols, throttled_rate, verbose_state)
+        # titles are replaced rather than modified so they are compared by identity
+        cached = self.title_cache.get(holder)
+        if not cached or cached[0] is not title or cached[1] != key:
+            logger.debug(f"s{index}:\t{screen_y}\t{location}\t[{self.lines},{self.cols}]")
+            cached = (title, key, self._render_title_line(title, key))
+            self.title_cache[holder] = cached
+        ansi.row(screen_y, cached[2])
+
+    def _render_title_line(self, title, key):
+        focused, stream_done, cols, throttled_rate, verbose_state = key
+        suffix = ""
+        if throttled_rate is not None:
+            suffix = f" [+{throttled_rate} lines/s]"
+        if verbose_state:
+            wrap, auto_scroll, collapsed, input_mode, filtered, buffer_line, box_height = verbose_state
             state = [
                 "W" if wrap else "-",
                 "-" if auto_scroll else "S",
                 "C" if collapsed else "-",
                 "I" if input_mode else "-",
+                "F" if filtered else "-",
             ]
             state = f"{''.join(state)} [{buffer_line},{box_height}]"
-            suffix = f" [{state}]"
+            suffix = f"{suffix} [{state}]"
         suffix_len = len(suffix)
-        title = iterator.title
         if not isinstance(title, C):
             title = C(title)
         title_len = len(title)
         hr_space = 4
         _ellipsis = "..."
-        if hr_space + title_len + suffix_len > self.cols:
-            title = title[: self.cols - suffix_len - len(_ellipsis) - hr_space]
+        if hr_space + title_len + suffix_len > cols:
+            title = title[: cols - suffix_len - len(_ellipsis) - hr_space]
             title += _ellipsis
         text = C(" ", title, suffix, " ", color=(NONE, NONE))
 
-        logger.debug(f"s{index}:\t{screen_y}\t{location}\t[{self.lines},{self.cols}]")
-
-        if index == self.current_focused_box:
+        if focused:
             hline_color = ansi.theme.TITLE_FOCUS
-        elif box_state.stream_done:
+        elif stream_done:
             hline_color = ansi.theme.TITLE_STREAM_DONE
         else:
             hline_color = ansi.theme.TITLE_NORMAL
-        ansi.title(
-            row=screen_y,
+        return ansi.title_code(
             text=text,
             hline_color=hline_color,
-            cols=self.cols,
+            cols=cols,
         )
 
     def _update_status_bar(self):
         if self.help.show:
             return
 
-        focused = self.focused
-        index = focused.index
-        iterator = self.get_iterator(index)
-        title = iterator.title
-        box_state = focused.state
-        wrap = box_state.wrap
-        auto_scroll = box_state.auto_scroll
-        input_mode = box_state.input_mode
+        title = None
+        if self.prompt.show:
+            key = (self.prompt.value, self.cols)
+        else:
+            focused = self.focused
+            title = self.get_iterator(focused.index).title
+            box_state = focused.state
+            key = (
+                focused.index,
+                box_state.auto_scroll,
+                self.maximized,
+                box_state.wrap,
+                bool(focused.buffer.line_filter),
+                box_state.input_mode,
+                self.output_saved,
+                tuple(self.input_reader.pending),
+                self.tasks.status,
+                self.cols,
+            )
+        cached = self.status_bar_cache
+        if not cached or cached[0] is not title or cached[1] != key:
+            cached = (title, key, self._render_status_bar(title, key))
+            self.status_bar_cache = cached
+        ansi.row(self.get_status_bar_line(), cached[2])
+
+    def _render_status_bar(self, title, key):
+        if self.prompt.show:
+            value, cols = key
+            value = value[-(cols - 1) :]
+            return ansi.status_bar_code(C(value, " " * (cols - len(value)), color=ansi.theme.STATUS_NORMAL))
+
+        index, auto_scroll, maximized, wrap, filtered, input_mode, output_saved, pending_keys, task_status, cols = key
 
         modes = []
         if not auto_scroll:
             modes.append("SCROLL")
-        if self.maximized:
+        if maximized:
             modes.append("MAXIMIZED")
         if wrap:
             modes.append("WRAP")
+        if filtered:
+            modes.append("FILTER")
         if input_mode:
             modes.append("INPUT")
         mode = "|".join(modes)
         mode_paren = f"({mode})" if mode else ""
 
-        pending_keys = self.input_reader.pending
-        pending_name_parts = []
-        while pending_keys:
-            cur_offset = len(pending_keys)
-            name = None
-            while not name and cur_offset:
-                name = keys.seq_to_name(pending_keys[:cur_offset], fallback=False)
-                if not name:
-                    cur_offset -= 1
-            pending_name_parts.append(name)
-            pending_keys = pending_keys[cur_offset:]
-
-        pending_text = "".join(pending_name_parts)
+        pending_text = "".join(keys.seq_to_names(pending_keys))
         if pending_text:
             pending_text = f"{pending_text} "
+        if task_status:
+            task_name, task_percent = task_status
+            pending_text = f"{pending_text}{task_name} {task_percent}% "
 
         prefix = f"[{index + 1}] "
         prefix_len = len(prefix)
@@ -518,13 +822,13 @@ class Viewer:
         title_len = len(title)
         mode_len = len(mode_paren)
         pending_len = len(pending_text)
-        space_between = self.cols - title_len - mode_len - pending_len - prefix_len
+        space_between = cols - title_len - mode_len - pending_len - prefix_len
         if space_between < 0:
             _ellipsis = "... "
-            title = title[: (self.cols - mode_len - pending_len - prefix_len) - len(_ellipsis)]
+            title = title[: (cols - mode_len - pending_len - prefix_len) - len(_ellipsis)]
             title += _ellipsis
             space_between = 0
-        if self.output_saved:
+        if output_saved:
             color = ansi.theme.STATUS_SAVE
         elif input_mode:
             color = ansi.theme.STATUS_INPUT
@@ -533,11 +837,7 @@ class Viewer:
         else:
             color = ansi.theme.STATUS_NORMAL
         text = C(prefix, title, " " * space_between, pending_text, mode_paren, color=color)
-
-        ansi.status_bar(
-            row=self.get_status_bar_line(),
-            text=text,
-        )
+        return ansi.status_bar_code(text)
 
     def _update_cursor(self):
         if not self.is_input_mode:
@@ -581,15 +881,15 @@ class Viewer:
     def is_input_mode(self):
         return self.focused.state.input_mode
 
+    @property
+    def visible_indices(self):
+        if self.maximized:
+            return [self.current_focused_box]
+        return self.layout.get_visible_range(self.current_view_line, self.current_view_line + self.get_max_box_line())
+
     @property
     def max_current_line(self):
-        result = 0
-        for state in self.states:
-            result += 1
-            if not state.collapsed:
-                result += state.box_height
-        result -= self.get_max_box_line()
-        return max(0, result)
+        return max(0, self.layout.total_lines - self.get_max_box_line())
 
     def get_status_bar_line(self):
         return self.lines - 1
@@ -623,13 +923,7 @@ class Viewer:
             state = self.get_state(index)
             if state.collapsed and box_line != BoxLine.TITLE:
                 return 0, ViewLocation.NOT_FOCUSED
-            view_y = 0
-            for i in range(index):
-                # title line
-                view_y += 1
-                other_state = self.states[i]
-                if not other_state.collapsed:
-                    view_y += other_state.box_height
+            view_y = self.layout.get_title_line(index)
             if box_line == BoxLine.TOP:
                 view_y += 1
             elif box_line == BoxLine.BOTTOM:
@@ -0,0 +1,69 @@
+import os
+import sys
+
+fd = None
+loop = None
+on_drain = None
+pending = bytearray()
+
+
+def setup(event_loop, drain_callback):
+    global fd, loop, on_drain
+    try:
+        tty_name = os.ttyname(sys.stdout.fileno())
+    except OSError:
+        # not a terminal, keep using blocking writes to stdout
+        return
+    # a separate open file description so stdin and the inherited stdout are left in blocking mode
+    fd = os.open(tty_name, os.O_WRONLY | os.O_NONBLOCK | os.O_NOCTTY)
+    loop = event_loop
+    on_drain = drain_callback
+
+
+def restore():
+    global fd, loop, on_drain
+    if fd is None:
+        return
+    loop.remove_writer(fd)
+    os.set_blocking(fd, True)
+    while pending:
+        del pending[: os.write(fd, pending)]
+    os.close(fd)
+    fd = None
+    loop = None
+    on_drain = None
+
+
+def is_active():
+    return fd is not None
+
+
+def is_busy():
+    return bool(pending)
+
+
+def write(text):
+    data = text.encode()
+    if pending:
+        pending.extend(data)
+        return
+    written = _write(data)
+    if written == len(data):
+        return
+    pending.extend(data[written:])
+    loop.add_writer(fd, _on_writable)
+
+
+def _write(data):
+    try:
+        return os.write(fd, data)
+    except BlockingIOError:
+        return 0
+
+
+def _on_writable():
+    del pending[: _write(pending)]
+    if pending:
+        return
+    loop.remove_writer(fd)
+    on_drain()
@@ -0,0 +1,101 @@
+import pytest
+from easyansi import screen
+
+from multiplex import ansi
+
+
+@pytest.fixture
+def output(monkeypatch):
+    result = []
+    monkeypatch.setattr(screen, "prnt", result.append)
+    ansi.restore()
+    ansi.clear()
+    ansi.flush()
+    result.clear()
+    yield result
+    ansi.restore()
+
+
+def test_flush_unchanged_rows(output):
+    ansi.text_box(0, 1, ["hello", "world"])
+    ansi.flush()
+    output.clear()
+    ansi.text_box(0, 1, ["hello", "world"])
+    ansi.flush()
+    assert output == []
+
+
+def test_flush_changed_suffix(output):
+    ansi.text_box(0, 1, ["hello", "world"])
+    ansi.flush()
+    output.clear()
+    ansi.text_box(0, 1, ["help", "world"])
+    ansi.flush()
+    assert output == [f"\x1b[1;4H{ansi.RESET}p{ansi.RESET}{ansi.CLEAR_LINE_END}"]
+
+
+def test_flush_restores_style(output):
+    red = ansi.color_code((ansi.RED, None))
+    ansi.text_box(2, 2, [f"ab{red}cd{ansi.RESET}"])
+    ansi.flush()
+    output.clear()
+    ansi.text_box(2, 2, [f"ab{red}ce{ansi.RESET}"])
+    ansi.flush()
+    assert output == [f"\x1b[3;4H{ansi.RESET}{red}e{ansi.RESET}"]
+
+
+def test_flush_unknown_screen(output):
+    ansi.invalidate()
+    ansi.text_box(0, 0, ["abc"])
+    ansi.flush()
+    assert output == [f"\x1b[1;1H{ansi.CLEAR_LINE}{ansi.RESET}abc{ansi.RESET}"]
+
+
+def test_frame_merge():
+    frame = ansi.Frame("", {0: "a", 1: "b"}, "p1")
+    merged = frame.merge(ansi.Frame("", {1: "c", 2: "d"}, "p2"))
+    assert merged == ansi.Frame("", {0: "a", 1: "c", 2: "d"}, "p1p2")
+    merged = frame.merge(ansi.Frame("x", {2: "d"}, "p2", ansi.CLEARED))
+    assert merged == ansi.Frame("x", {2: "d"}, "p1p2", ansi.CLEARED)
+
+
+def test_render_thread(output):
+    ansi.start_render_thread()
+    ansi.text_box(0, 1, ["hello", "world"])
+    ansi.flush()
+    ansi.text_box(0, 0, ["help"])
+    ansi.flush()
+    ansi.stop_render_thread()
+    # depending on timing the second frame is either diffed against the first or merged into it
+    assert ansi.shadow == {0: ("help", 4), 1: ("world", 5)}
+    assert "world" in "".join(output)
+
+
+def test_flush_scrolls_region(output):
+    ansi.text_box(1, 4, ["1", "2", "3", "4"])
+    ansi.flush()
+    output.clear()
+    ansi.text_box(1, 4, ["2", "3", "4", "5"])
+    ansi.flush()
+    assert output == [f"\x1b[2;5r\x1b[2;1H{ansi.RESET}\x1b[1M\x1b[r\x1b[5;1H{ansi.RESET}5{ansi.RESET}"]
+    output.clear()
+    ansi.text_box(1, 4, ["0", "2", "3", "4"])
+    ansi.flush()
+    assert output == [f"\x1b[2;5r\x1b[2;1H{ansi.RESET}\x1b[1L\x1b[r\x1b[2;1H{ansi.RESET}0{ansi.RESET}"]
+
+
+def test_find_shift():
+    assert ansi._find_shift(["a", "b", "c"], ["a", "b", "c"]) == 0
+    assert ansi._find_shift(["b", "c", "d"], ["a", "b", "c"]) == 1
+    assert ansi._find_shift(["c", "d", "e"], ["a", "b", "c"]) == 2
+    assert ansi._find_shift(["x", "a", "b"], ["a", "b", "c"]) == -1
+    assert ansi._find_shift(["", "", ""], ["", "", ""]) == 0
+    assert ansi._find_shift(["b", "x", "d"], ["a", "b", "c"]) == 0
+
+
+def test_flush_synchronized_output(output):
+    ansi.set_synchronized_output(True)
+    ansi.text_box(0, 0, ["abc"])
+    ansi.flush()
+    ansi.flush()
+    assert output == [f"\x1b[?2026h\x1b[1;1H{ansi.RESET}abc{ansi.RESET}\x1b[?2026l"]
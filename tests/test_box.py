@@ -0,0 +1,17 @@
+import pytest
+
+from multiplex.box import RateMeter
+
+
+def test_rate_meter():
+    meter = RateMeter()
+    assert meter.rate(0.5) == 0
+    meter.add(100, 0.2)
+    meter.add(200, 0.9)
+    assert meter.rate(0.95) == 0
+    meter.add(50, 1.2)
+    assert meter.rate(1.5) == pytest.approx(300 / 1.2)
+    assert meter.rate(2.3) == pytest.approx(50 / 1.1)
+    assert meter.rate(3.3) == 0
+    meter.add(10, 5)
+    assert meter.rate(5.1) == 0
@@ -1,4 +1,7 @@
-from multiplex.buffer import Buffer
+import time
+
+from multiplex import buffer as buffer_module
+from multiplex.buffer import Buffer, LineTimes, MaxIndex, SearchIndex, _required_literals
 
 
 def test_buffer_kitchen():
@@ -32,3 +35,221 @@ def test_buffer_kitchen():
     assert buffer.convert_line_number(2, from_wrapped=True) == 0
     assert buffer.convert_line_number(3, from_wrapped=True) == 1
     assert buffer.convert_line_number(4, from_wrapped=True) == 1
+
+
+def test_buffer_search():
+    buffer = Buffer(10)
+    for i in range(1000):
+        buffer.write(f"line {i} {'needle' if i % 300 == 0 else 'hay'}\n")
+    assert list(buffer.search("needle")) == [0, 300, 600, 900]
+    assert list(buffer.search("NEEDLE")) == []
+    assert list(buffer.search("Needle".lower())) == [0, 300, 600, 900]
+    assert list(buffer.search("needle", start_raw_line=301)) == [600, 900]
+    assert list(buffer.search("needle", start_raw_line=599, reverse=True)) == [300, 0]
+    assert list(buffer.search(r"\d+ n.edle$")) == [0, 300, 600, 900]
+    assert list(buffer.search("line 5 |line 7 ")) == [5, 7]
+
+
+def test_buffer_search_trimmed():
+    buffer = Buffer(10, buffer_lines=100)
+    for i in range(1000):
+        buffer.write(f"line {i} {'needle' if i % 300 == 0 else 'hay'}\n")
+    assert list(buffer.search("needle")) == [900]
+    assert list(buffer.search("needle", start_raw_line=0)) == [900]
+
+
+def test_buffer_search_wrap_around(monkeypatch):
+    monkeypatch.setattr(buffer_module, "SEARCH_CHUNK_LINES", 100)
+    buffer = Buffer(10)
+    for i in range(1000):
+        buffer.write(f"line {i} {'needle' if i % 300 == 0 else 'hay'}\n")
+    assert list(buffer.search("needle", start_raw_line=601, wrap_around=True)) == [900, 0, 300, 600]
+    assert list(buffer.search("needle", start_raw_line=299, reverse=True, wrap_around=True)) == [0, 900, 600, 300]
+    steps = list(buffer.search_steps("needle|hay", start_raw_line=500, wrap_around=True))
+    assert len([raw_line for _, raw_line in steps if raw_line is None]) == 10
+    assert [raw_line for _, raw_line in steps if raw_line is not None][:2] == [500, 501]
+    progress = [progress for progress, _ in steps]
+    assert progress == sorted(progress) and progress[-1] < 1
+
+
+def test_required_literals():
+    assert _required_literals("abc") == [["abc"]]
+    assert _required_literals("a.c") == [["a", "c"]]
+    assert _required_literals(r"foo\.bar") == [["foo.bar"]]
+    assert _required_literals("ab?cd") == [["a", "cd"]]
+    assert _required_literals("(abc)def") == [["def"]]
+    assert _required_literals("[abc]xyz") == [["xyz"]]
+    assert _required_literals(r"\d+hello") == [["hello"]]
+    assert _required_literals(r"\x41bcd") == [[]]
+    assert _required_literals("a|b") == [["a"], ["b"]]
+    assert _required_literals("foo|bar.baz") == [["foo"], ["bar", "baz"]]
+    assert _required_literals(r"(a|b)cde|[|]fgh|i\|jk") == [["cde"], ["fgh"], ["i|jk"]]
+
+
+def test_search_index_alternatives():
+    index = SearchIndex()
+    index.add(0, "foo")
+    index.add(SearchIndex.SEGMENT_LINES, "bar")
+    index.add(2 * SearchIndex.SEGMENT_LINES, "baz")
+    end_line = 3 * SearchIndex.SEGMENT_LINES - 1
+    segments = {line // SearchIndex.SEGMENT_LINES for line in index.candidate_lines("foo|bar", 0, end_line)}
+    assert segments == {0, 1}
+    segments = {line // SearchIndex.SEGMENT_LINES for line in index.candidate_lines("foo|b.z", 0, end_line)}
+    assert segments == {0, 1, 2}
+
+
+def test_buffer_filter():
+    width = 5
+    buffer = Buffer(width, buffer_lines=20)
+    for i in range(10):
+        buffer.write(f"{i}{'ab' if i % 3 == 0 else 'cd'}\n")
+    buffer.set_filter("ab")
+    assert buffer.get_min_line(wrap=True) == 0
+    assert buffer.get_max_line(wrap=True) == 3
+    assert buffer.get_lines(2, 1, width, 0, wrap=True) == [(3, "3ab  "), (3, "6ab  ")]
+    assert buffer.get_raw_line(2, wrap=True) == 6
+    assert buffer.get_line_number(7, wrap=True) == 3
+
+    buffer.write("10ab\r11cd")
+    assert buffer.get_max_line(wrap=True) == 3
+    buffer.write("\n12ab\n")
+    assert buffer.get_max_line(wrap=True) == 4
+    assert buffer.get_lines(1, 4, width, 0, wrap=True) == [(4, "12ab ")]
+
+    for i in range(13, 30):
+        buffer.write(f"{i}cd\n")
+    assert buffer.get_min_line(wrap=True) == 3
+    assert buffer.get_lines(2, 3, width, 0, wrap=True) == [(3, "9ab  "), (4, "12ab ")]
+
+    buffer.set_filter(None)
+    assert buffer.get_max_line(wrap=False) == 28
+
+
+def test_buffer_line_times(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(time, "time", lambda: now)
+    monkeypatch.setattr(LineTimes, "BLOCK_LINES", 4)
+    buffer = Buffer(5, buffer_lines=10)
+    for i in range(20):
+        now = 1000.0 + i
+        buffer.write(f"{i}\n")
+    now = 2000.0
+    buffer.write("abc")
+    assert buffer.get_line_time(19) == 1019.0
+    assert buffer.get_line_time(20) == 2000.0
+    assert buffer.get_line_time(0) is None
+    assert buffer.find_time(1012.5) == 13
+    assert buffer.find_time(1013) == 13
+    assert buffer.find_time(500) == buffer.line_times.first_line
+    assert buffer.find_time(5000) == 20
+    assert len(buffer.line_times) <= 10 + LineTimes.BLOCK_LINES
+
+
+def test_buffer_line_sequences(monkeypatch):
+    monkeypatch.setattr(LineTimes, "BLOCK_LINES", 4)
+    first = Buffer(5, buffer_lines=10)
+    second = Buffer(5)
+    for i in range(30):
+        first.write(f"{i}\n")
+        for _ in range(i % 3):
+            second.write(f"{i}\n")
+    for buffer in (first, second):
+        line_times = buffer.line_times
+        raw_lines = range(line_times.first_line, line_times.first_line + len(line_times))
+        sequences = [line_times.get_sequence(raw_line) for raw_line in raw_lines]
+        assert sequences == sorted(set(sequences))
+        assert line_times.get_sequence(raw_lines[0] - 1) is None
+        assert line_times.get_sequence(raw_lines[-1] + 1) is None
+        for sequence in range(sequences[0] - 1, sequences[-1] + 2):
+            expected = next((raw_line for raw_line, s in zip(raw_lines, sequences) if s >= sequence), raw_lines[-1] + 1)
+            assert line_times.find_sequence(sequence) == expected
+    assert first.line_times.first_line > 0
+
+
+def test_max_index():
+    index = MaxIndex(size=2)
+    index.set(0, 5)
+    index.set(3, 7)
+    index.set(10, 2)
+    assert index.size == 16
+    assert index.query(0, 11) == 7
+    assert index.query(4, 11) == 2
+    assert index.query(0, 3) == 5
+    index.set(3, 1)
+    assert index.query(0, 11) == 5
+    assert index.query(20, 30) == 0
+
+
+def test_max_index_remove_before():
+    index = MaxIndex(size=4)
+    for i in range(1000):
+        index.set(i, i % 7)
+        index.remove_before(i - 9)
+        assert index.query(0, i + 1) == max(j % 7 for j in range(max(0, i - 9), i + 1))
+    assert index.size <= 32
+    assert index.query(990, 995) == max(j % 7 for j in range(990, 995))
+    assert index.query(0, 990) == 0
+
+
+def test_buffer_longest_line():
+    buffer = Buffer(5, buffer_lines=3)
+    buffer.write("1234567\n12\n123\n")
+    assert buffer.get_longest_line(0, buffer.get_max_line(wrap=False)) == 7
+    buffer.write("1234\n")
+    min_line = buffer.get_min_line(wrap=False)
+    assert buffer.get_longest_line(min_line, buffer.get_max_line(wrap=False)) == 4
+    assert buffer.get_longest_line(0, 0) == 0
+    for i in range(5000):
+        buffer.write(f"{i}\n")
+    assert buffer.lined_buffer.line_widths.size == 1024
+    min_line = buffer.get_min_line(wrap=False)
+    assert buffer.get_longest_line(min_line, buffer.get_max_line(wrap=False)) == 4
+
+
+def test_buffer_style_transitions():
+    buffer = Buffer(10)
+    buffer.write("\x1b[31mab\x1b[1mcd\x1b[0;32mef\x1b[44mg\x1b[0mh")
+    assert buffer.get_lines(1, 0, 10, 0, wrap=True) == [(8, "\x1b[31mab\x1b[1mcd\x1b[0;32mef\x1b[44mg\x1b[0mh  ")]
+
+
+def test_buffer_reflow_with_writes():
+    buffer = Buffer(5)
+    buffer.write("\n".join(str(i) * 4 for i in range(200)))
+    steps = buffer.reflow(2)
+    next(steps)
+    buffer.write("\nabc")
+    for _ in steps:
+        pass
+    assert buffer.width == 5
+    buffer.width = 2
+    expected = buffer.wrapping_buffer
+    buffer.width = 5
+    steps = buffer.reflow(2)
+    next(steps)
+    buffer.write("de")
+    try:
+        while True:
+            next(steps)
+    except StopIteration as e:
+        buffer.wrapping_buffer = e.value
+    assert buffer.reflow_writes is None
+    assert buffer.get_max_line(wrap=True) == expected.max_line + 1
+    assert buffer.get_lines(2, buffer.get_max_line(wrap=True) - 1, 2, 0, wrap=True) == [(2, "cd"), (1, "e ")]
+    assert buffer.get_raw_line(buffer.get_max_line(wrap=True), wrap=True) == 200
+
+
+def test_raw_buffer_chunks():
+    for buffer_lines in (None, 50, 1000):
+        buffer = Buffer(10, buffer_lines=buffer_lines)
+        raw_buffer = buffer.raw_buffer
+        for i in range(300):
+            buffer.write(f"line {i}{'x' * (i % 40)}\n")
+        buffer.write("partial")
+        value = raw_buffer.getvalue()
+        assert len(raw_buffer) == len(value)
+        chunks = raw_buffer.chunks(100)
+        first = next(chunks)
+        buffer.write(" more\n")
+        assert first + "".join(chunks) == value
+        assert all(len(chunk) < 200 for chunk in raw_buffer.chunks(100))
+        assert raw_buffer.getvalue().endswith("partial more\n")
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from multiplex import dispatcher
+from multiplex.dispatcher import PriorityDispatcher
+
+pytestmark = pytest.mark.asyncio
+
+PRIORITIES = {"input": dispatcher.INPUT, "focused": dispatcher.FOCUSED, "hidden": dispatcher.HIDDEN}
+
+
+async def source(name, count):
+    for i in range(count):
+        yield name, i
+
+
+async def sources(*items):
+    for item in items:
+        yield item
+
+
+def get_priority(event):
+    return PRIORITIES[event[0]]
+
+
+async def collect(streamer, count):
+    result = []
+    async for event in streamer:
+        result.append(event)
+        if len(result) == count:
+            break
+    return result
+
+
+async def test_priority_order():
+    all_sources = sources(source("hidden", 1), source("focused", 1), source("input", 1))
+    async with PriorityDispatcher(all_sources, get_priority) as streamer:
+        await asyncio.sleep(0.01)
+        assert await collect(streamer, 3) == [("input", 0), ("focused", 0), ("hidden", 0)]
+
+
+async def test_source_order():
+    async with PriorityDispatcher(sources(source("hidden", 3), source("focused", 3)), get_priority) as streamer:
+        result = await collect(streamer, 6)
+    assert [i for name, i in result if name == "hidden"] == [0, 1, 2]
+    assert [i for name, i in result if name == "focused"] == [0, 1, 2]
+
+
+async def test_starvation_bounded():
+    async def flood():
+        i = 0
+        while True:
+            yield "focused", i
+            i += 1
+            await asyncio.sleep(0)
+
+    async with PriorityDispatcher(sources(flood(), source("hidden", 1)), get_priority, max_wait=0.01) as streamer:
+        async for name, i in streamer:
+            if name == "hidden":
+                break
+            assert i < 10000
+
+
+async def test_end_and_error():
+    async with PriorityDispatcher(sources(source("focused", 2)), get_priority) as streamer:
+        assert await collect(streamer, 3) == [("focused", 0), ("focused", 1)]
+
+    async def failing():
+        yield "focused", 0
+        raise RuntimeError("failed")
+
+    with pytest.raises(RuntimeError):
+        async with PriorityDispatcher(sources(failing()), get_priority) as streamer:
+            await collect(streamer, 3)
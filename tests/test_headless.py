@@ -0,0 +1,30 @@
+import io
+
+from multiplex.headless import StreamBuffer
+
+
+class Output(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.flushes = 0
+
+    def flush(self):
+        self.flushes += 1
+
+
+def test_stream_buffer():
+    output = Output()
+    buffer = StreamBuffer("box", output, buffer_lines=2)
+    buffer.write("a\nb")
+    buffer.write("c\nd\ne\r\nf")
+    buffer.close(exit_code=1)
+    assert output.getvalue().splitlines() == [
+        "[box] a",
+        "[box] bc",
+        "[box] d",
+        "[box] e",
+        "[box] f",
+        "[box] exited with code 1",
+    ]
+    assert buffer.raw_buffer.getvalue() == "d\ne\r\nf"
+    assert not output.flushes
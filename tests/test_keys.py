@@ -1,6 +1,6 @@
 import pytest
 
-from multiplex.keys import generic_key_to_name, seq_to_name, HOME, is_multi, key_to_seq, bind
+from multiplex.keys import generic_key_to_name, seq_to_name, HOME, is_multi, key_to_seq, bind, KeyTrie, seq_to_names, UP
 
 
 def test_generic_key_to_name_printable():
@@ -110,3 +110,19 @@ def test_bind_seq_to_name_description():
         pass
 
     assert descriptions[mode][("aEsc",)] == "fn1"
+
+
+def test_key_trie():
+    trie = KeyTrie([((1, 2), "a"), ((1, 2, 3, 4), "b"), ((5,), "c")])
+    assert trie.match((1, 2, 3, 4)) == ("a", 2, False)
+    assert trie.match((9, 1, 2), 1) == ("a", 3, False)
+    assert trie.match((1,)) == (None, 0, True)
+    assert trie.match((1, 3)) == (None, 0, False)
+    assert trie.longest_match((1, 2, 3, 4, 5)) == ("b", 4)
+    assert trie.longest_match((1, 2, 3)) == ("a", 2)
+    assert trie.longest_match((6,)) == (None, 0)
+
+
+def test_seq_to_names():
+    assert seq_to_names([]) == []
+    assert seq_to_names([ord("g"), *UP, 11, 20]) == ["g", "↑", "^K", "[20]"]
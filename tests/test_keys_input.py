@@ -1,10 +1,12 @@
-from contextlib import contextmanager
+import asyncio
+import os
 from functools import partial
 from unittest import mock
-from unittest.mock import Mock
+
+import pytest
 
 from multiplex.keys import bind as _bind, HELP, SCROLL, NORMAL, GLOBAL, INPUT
-from multiplex.keys_input import InputReader
+from multiplex.keys_input import InputReader, TerminalReports
 
 
 def _test_set(show_help=False, auto_scroll=True, input_mode=False):
@@ -18,6 +20,7 @@ def _test_set(show_help=False, auto_scroll=True, input_mode=False):
 class MockViewer:
     def __init__(self, show_help=False, auto_scroll=True, input_mode=False):
         self.help = MockHelp(show_help)
+        self.prompt = MockPrompt()
         self.is_input_mode = input_mode
         self.is_scrolling = not auto_scroll
 
@@ -27,6 +30,11 @@ class MockHelp:
         self.show = show
 
 
+class MockPrompt:
+    def __init__(self, show=False):
+        self.show = show
+
+
 class MockBox:
     def __init__(self, auto_scroll):
         self.state = MockBoxState(auto_scroll)
@@ -131,23 +139,10 @@ def test_process_more_than_one_sequence():
     assert reader._process(keys3) == ([fn1, fn2], [])
 
 
-@contextmanager
-def patch_read(data=None, read=None):
-    mock_has_data = Mock()
-    mock_has_data.side_effect = data or [False]
-    mock_read = Mock()
-    mock_read.side_effect = read or []
-    with mock.patch("sys.stdin.fileno", Mock()):
-        with mock.patch("os.read", mock_read):
-            with mock.patch("multiplex.keys_input._has_data", mock_has_data):
-                yield
-
-
 def test_read_iteration_no_data():
     bind, reader = _test_set()
     assert reader.pending == []
-    with patch_read(data=[False]):
-        assert reader._read_iteration() is None
+    assert reader._read_iteration() is None
     assert reader.pending == []
 
 
@@ -158,8 +153,8 @@ def test_read_iteration_process_one():
     def fn1():
         pass
 
-    with patch_read(data=[True, True, False], read=["a"]):
-        assert reader._read_iteration() == [fn1]
+    reader.data.extend(b"a")
+    assert reader._read_iteration() == [fn1]
 
     assert reader.pending == []
 
@@ -171,8 +166,8 @@ def test_read_iteration_has_pending():
     def fn1():
         pass
 
-    with patch_read(data=[True, True, False], read=["a"]):
-        assert reader._read_iteration() == []
+    reader.data.extend(b"a")
+    assert reader._read_iteration() == []
 
     assert reader.pending == [ord("a")]
 
@@ -184,8 +179,151 @@ def test_read_iteration_backspace_and_delete():
     def fn1():
         pass
 
-    with patch_read(data=[True, True, True, True, True, True, True, True], read=["a", "b", "c", chr(8), chr(127)]):
-        assert reader._read_iteration() == []
-        assert reader.pending == [ord("a"), ord("b")]
-        assert reader._read_iteration() == []
-        assert reader.pending == [ord("a")]
+    reader.data.extend(b"abc\x08\x7f")
+    assert reader._read_iteration() == []
+    assert reader.pending == [ord("a"), ord("b")]
+    assert reader._read_iteration() == []
+    assert reader.pending == [ord("a")]
+    assert reader._read_iteration() is None
+
+
+def test_read_iteration_prompt():
+    bind, reader = _test_set()
+    reader.viewer.prompt.show = True
+
+    @bind(NORMAL, "a")
+    def fn1():
+        pass
+
+    reader.data.extend(b"ab")
+    result = reader._read_iteration()
+
+    assert len(result) == 1
+    assert result[0].args == ([b"a", b"b"],)
+    assert reader.pending == []
+
+
+def test_read_iteration_mode_report():
+    bind, reader = _test_set()
+    reports = []
+    reader.viewer.on_mode_report = lambda mode, value: reports.append((mode, value))
+
+    @bind(NORMAL, "a")
+    def fn1():
+        pass
+
+    reader.data.extend(b"\x1b[?2026;2$ya")
+    assert reader._read_iteration() == [fn1]
+    assert reports == [(2026, 2)]
+
+
+def test_terminal_reports_not_a_report():
+    reports = []
+    terminal_reports = TerminalReports(lambda mode, value: reports.append((mode, value)), reports.append)
+    assert terminal_reports.feed(b"\x1b") == []
+    assert terminal_reports.feed(b"[") == []
+    assert terminal_reports.feed(b"A") == [b"\x1b", b"[", b"A"]
+    assert terminal_reports.feed(b"\x1b") == []
+    assert terminal_reports.flush() == [b"\x1b"]
+    assert reports == []
+
+
+def test_terminal_reports_focus():
+    focus_changes = []
+    terminal_reports = TerminalReports(lambda mode, value: None, focus_changes.append)
+    assert [terminal_reports.feed(key) for key in (b"\x1b", b"[", b"O", b"a")] == [[], [], [], [b"a"]]
+    assert [terminal_reports.feed(key) for key in (b"\x1b", b"[", b"I")] == [[], [], []]
+    assert focus_changes == [False, True]
+
+
+@pytest.mark.asyncio
+async def test_read():
+    bind, reader = _test_set()
+
+    @bind(NORMAL, "a")
+    def fn1():
+        pass
+
+    read_fd, write_fd = os.pipe()
+    try:
+        with mock.patch("sys.stdin.fileno", lambda: read_fd):
+            events = reader.read()
+            os.write(write_fd, b"a")
+            assert await asyncio.wait_for(events.__anext__(), 1) == (-1, [fn1])
+            os.write(write_fd, b"b\x08a")
+            assert await asyncio.wait_for(events.__anext__(), 1) == (-1, [])
+            assert await asyncio.wait_for(events.__anext__(), 1) == (-1, [fn1])
+            await events.aclose()
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+def test_read_iteration_paste():
+    bind, reader = _test_set(input_mode=True)
+    reader.data.extend(b"a\x1b[200~b\x1b[A")
+    result = reader._read_iteration()
+    assert [fn.args for fn in result] == [(b"a",)]
+    assert reader._read_iteration() is None
+    reader.data.extend(b"c\x1b[201")
+    assert reader._read_iteration() is None
+    reader.data.extend(b"~d")
+    result = reader._read_iteration()
+    assert [fn.args for fn in result] == [(b"b\x1b[Ac",)]
+    result = reader._read_iteration()
+    assert [fn.args for fn in result] == [(b"d",)]
+
+
+def test_read_iteration_paste_not_input():
+    bind, reader = _test_set()
+
+    @bind(NORMAL, "a")
+    def fn1():
+        pass
+
+    reader.data.extend(b"\x1b[200~aaa\x1b[201~a")
+    assert reader._read_iteration() == []
+    assert reader._read_iteration() == [fn1]
+
+    reader.viewer.prompt.show = True
+    reader.data.extend(b"x\x1b[200~a\nb\x1b[201~")
+    result = reader._read_iteration()
+    assert [fn.args for fn in result] == [([b"x"],), (b"a\nb",)]
+
+
+@pytest.mark.asyncio
+async def test_cancel_input_writes():
+    class BlockedWriter:
+        def __init__(self):
+            self.written = []
+
+        def write(self, data):
+            self.written.append(data)
+
+        async def drain(self):
+            await asyncio.Event().wait()
+
+    bind, reader = _test_set(input_mode=True)
+    writer = BlockedWriter()
+    reader.viewer.focused = MockBox(auto_scroll=True)
+    reader.viewer.focused.holder = mock.Mock(iterator=mock.Mock(metadata={"input": writer}))
+    reader._read_input_handler(b"a" * 10000, reader.viewer)
+    reader._read_input_handler(b"b", reader.viewer)
+    await asyncio.sleep(0)
+    task = reader.input_task
+    assert len(writer.written) == 1 and len(reader.input_writes) == 1
+    await reader.cancel_input_writes()
+    assert task.done()
+    assert not reader.input_task
+    assert not reader.input_writes
+    assert len(writer.written) == 1
+
+
+def test_terminal_reports_not_paste():
+    terminal_reports = TerminalReports(lambda mode, value: None, lambda focused: None, lambda: None)
+    assert [terminal_reports.feed(key) for key in (b"\x1b", b"[", b"2", b"~")] == [
+        [],
+        [],
+        [],
+        [b"\x1b", b"[", b"2", b"~"],
+    ]
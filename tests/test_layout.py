@@ -0,0 +1,25 @@
+from multiplex.box import BoxState
+from multiplex.layout import LayoutIndex
+
+
+class MockViewer:
+    def __init__(self, heights):
+        self.layout = LayoutIndex(self)
+        self.states = [BoxState(height, on_layout_change=self.layout.invalidate) for height in heights]
+
+
+def test_layout_index():
+    viewer = MockViewer([3, 5, 2, 4])
+    layout = viewer.layout
+    assert layout.offsets == [0, 4, 10, 13, 18]
+    assert layout.total_lines == 18
+    assert layout.get_title_line(2) == 10
+    assert list(layout.get_visible_range(0, 3)) == [0]
+    assert list(layout.get_visible_range(3, 4)) == [0, 1]
+    assert list(layout.get_visible_range(11, 30)) == [2, 3]
+    assert list(layout.get_visible_range(18, 30)) == []
+
+    viewer.states[1].collapsed = True
+    assert layout.offsets == [0, 4, 5, 8, 13]
+    viewer.states[0].box_height = 1
+    assert layout.offsets == [0, 2, 3, 6, 11]
@@ -40,3 +40,22 @@ async def test_sanity(tmpdir):
     assert len(listing) == len(expected) + 1
     for i, ex in enumerate(expected):
         assert listing[i].read_text("utf-8").strip() == ex
+
+
+async def test_headless(tmpdir):
+    cmd = "mp --headless 'echo 1' 'printf 2; exit 4'"
+    proc = await asyncio.subprocess.create_subprocess_shell(
+        cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    stdout, _ = await proc.communicate()
+    assert proc.returncode == 4
+    lines = stdout.decode().splitlines()
+    assert sorted(lines) == [
+        "[echo 1] 1",
+        "[echo 1] exited with code 0",
+        "[printf 2; exit 4] 2",
+        "[printf 2; exit 4] exited with code 4",
+    ]
@@ -0,0 +1,30 @@
+from multiplex import palette
+from multiplex.buffer import Buffer
+from multiplex import ansi
+
+
+def test_detect_depth():
+    assert palette.detect_depth({"COLORTERM": "truecolor", "TERM": "xterm"}) == palette.TRUECOLOR
+    assert palette.detect_depth({"TERM": "xterm-256color"}) == palette.COLORS_256
+    assert palette.detect_depth({"TERM": "xterm"}) == palette.COLORS_16
+    assert palette.detect_depth({}) == palette.COLORS_16
+
+
+def test_convert():
+    assert palette.rgb_to_256(255, 0, 0) == 196
+    assert palette.rgb_to_256(128, 128, 128) == 244
+    assert palette.convert((38, 2, 255, 0, 0), palette.TRUECOLOR) == (38, 2, 255, 0, 0)
+    assert palette.convert((38, 2, 255, 0, 0), palette.COLORS_256) == (38, 5, 196)
+    assert palette.convert((38, 2, 255, 0, 0), palette.COLORS_16) == (91,)
+    assert palette.convert((48, 5, 4), palette.COLORS_16) == (44,)
+    assert palette.convert((31,), palette.COLORS_16) == (31,)
+
+
+def test_buffer_color_depth(monkeypatch):
+    buffer = Buffer(5)
+    buffer.write("\x1b[38;2;255;0;0mab\x1b[48;2;0;0;0mc")
+    assert buffer.get_lines(1, 0, 5, 0, wrap=True) == [(3, "\x1b[38;2;255;0;0mab\x1b[48;2;0;0;0mc\x1b[0m  ")]
+    monkeypatch.setattr(ansi, "color_depth", palette.COLORS_256)
+    assert buffer.get_lines(1, 0, 5, 0, wrap=True) == [(3, "\x1b[38;5;196mab\x1b[48;5;16mc\x1b[0m  ")]
+    monkeypatch.setattr(ansi, "color_depth", palette.COLORS_16)
+    assert buffer.get_lines(1, 0, 5, 0, wrap=True) == [(3, "\x1b[91mab\x1b[40mc\x1b[0m  ")]
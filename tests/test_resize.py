@@ -0,0 +1,67 @@
+import asyncio
+import contextlib
+import os
+import signal
+
+import pytest
+
+from multiplex import resize
+
+pytestmark = pytest.mark.asyncio
+
+
+class Events:
+    def __init__(self, loop):
+        self.loop = loop
+        self.redraws = []
+
+    def send_redraw(self):
+        self.redraws.append(self.loop.time())
+
+
+@contextlib.contextmanager
+def resize_events(monkeypatch):
+    monkeypatch.setattr(resize, "DEBOUNCE_DELAY", 0.05)
+    monkeypatch.setattr(resize, "MAX_DELAY", 0.15)
+    loop = asyncio.get_running_loop()
+    events = Events(loop)
+    resize.setup(events, loop)
+    try:
+        yield events
+    finally:
+        resize.restore(loop)
+
+
+async def resize_for(duration, interval=0.01):
+    loop = asyncio.get_running_loop()
+    end = loop.time() + duration
+    while loop.time() < end:
+        os.kill(os.getpid(), signal.SIGWINCH)
+        await asyncio.sleep(interval)
+    return loop.time()
+
+
+async def test_debounce(monkeypatch):
+    with resize_events(monkeypatch) as events:
+        last_resize = await resize_for(0.08)
+        await asyncio.sleep(0.1)
+    assert len(events.redraws) == 1
+    assert events.redraws[0] >= last_resize + 0.03
+
+
+async def test_max_delay(monkeypatch):
+    with resize_events(monkeypatch) as events:
+        start = events.loop.time()
+        await resize_for(0.5)
+        await asyncio.sleep(0.1)
+    assert len(events.redraws) >= 3
+    gaps = [b - a for a, b in zip([start] + events.redraws, events.redraws)]
+    assert max(gaps) < 0.15 + 0.05
+
+
+async def test_restore_cancels_pending_redraw(monkeypatch):
+    with resize_events(monkeypatch) as events:
+        os.kill(os.getpid(), signal.SIGWINCH)
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.1)
+    assert not events.redraws
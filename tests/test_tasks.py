@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from multiplex import tasks
+from multiplex.tasks import TaskRunner
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_task_runner():
+    events = []
+    statuses = []
+    runner = TaskRunner(lambda: statuses.append(runner.status), slice_duration=0)
+
+    def steps(name, count):
+        for i in range(count):
+            events.append((name, i))
+            yield (i + 1) / count
+
+    runner.submit("first", steps("first", 2), on_done=lambda: events.append("first done"))
+    runner.submit("second", steps("second", 1))
+    assert runner.status == ("first", 0)
+    for _ in range(10):
+        await asyncio.sleep(0)
+    assert events == [("first", 0), ("first", 1), "first done", ("second", 0)]
+    assert statuses == [("first", 50), ("first", 100), ("second", 0), ("second", 100), None]
+    assert runner.runner is None
+
+
+async def test_task_runner_cancel():
+    closed = []
+    runner = TaskRunner(lambda: None)
+
+    def steps():
+        try:
+            while True:
+                yield 0
+        finally:
+            closed.append(True)
+
+    task = runner.submit("endless", steps())
+    await asyncio.sleep(0)
+    runner.cancel(task)
+    assert closed == [True]
+    assert runner.status is None
+
+
+async def test_task_runner_priority():
+    events = []
+    runner = TaskRunner(lambda: None, slice_duration=0)
+
+    def steps(name, count):
+        for i in range(count):
+            events.append((name, i))
+            yield (i + 1) / count
+
+    runner.submit("reflow", steps("reflow", 3))
+    await asyncio.sleep(0)
+    runner.submit("save", steps("save", 1))
+    runner.submit("search", steps("search", 2), priority=tasks.INTERACTIVE)
+    for _ in range(10):
+        await asyncio.sleep(0)
+    assert events == [("reflow", 0), ("search", 0), ("search", 1), ("reflow", 1), ("reflow", 2), ("save", 0)]
@@ -0,0 +1,60 @@
+import time
+
+from multiplex.buffer import Buffer
+from multiplex.timeline import TimelineBuffer
+
+
+class MockHolder:
+    def __init__(self, index, buffer):
+        self.index = index
+        self.buffer = buffer
+
+
+class MockViewer:
+    def __init__(self, buffers):
+        self.holders = [MockHolder(i, b) for i, b in enumerate(buffers)]
+        self.cols = 10
+
+    @property
+    def num_boxes(self):
+        return len(self.holders)
+
+
+def test_timeline_merge(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(time, "time", lambda: now)
+    buffer1 = Buffer(10)
+    buffer2 = Buffer(10)
+    for i, (buffer, text) in enumerate([(buffer1, "a1"), (buffer2, "b1"), (buffer2, "b2"), (buffer1, "a2")]):
+        now = 1000.0 + i // 2
+        buffer.write(f"{text}\n")
+    timeline = TimelineBuffer(MockViewer([buffer1, buffer2]))
+    assert timeline.get_max_line(wrap=False) == 3
+    lines = [line for _, line in timeline.get_lines(4, 0, 6, 0, wrap=False)]
+    assert lines == ["[1] a1", "[2] b1", "[2] b2", "[1] a2"]
+    lines = [line for _, line in timeline.get_lines(2, 1, 6, 0, wrap=False)]
+    assert lines == ["[2] b1", "[2] b2"]
+    assert timeline.find_time(1001) == 2
+
+
+def test_timeline_search():
+    buffer1 = Buffer(10)
+    buffer2 = Buffer(10)
+    for buffer, text in [(buffer1, "a1"), (buffer2, "b1"), (buffer1, "a2"), (buffer2, "b2"), (buffer1, "a3")]:
+        buffer.write(f"{text}\n")
+    timeline = TimelineBuffer(MockViewer([buffer1, buffer2]))
+    assert list(timeline.search("b")) == [1, 3]
+    assert list(timeline.search("A", start_raw_line=1)) == []
+    assert list(timeline.search("a", start_raw_line=1)) == [2, 4]
+    assert list(timeline.search("a", start_raw_line=3, wrap_around=True)) == [4, 0, 2]
+    assert list(timeline.search("a", start_raw_line=3, reverse=True, wrap_around=True)) == [2, 0, 4]
+    assert list(timeline.search("a", start_raw_line=5, reverse=True)) == [4, 2, 0]
+    assert list(timeline.search("a", start_raw_line=-1, wrap_around=True)) == [0, 2, 4]
+    assert list(TimelineBuffer(MockViewer([])).search("a")) == []
+
+
+def test_timeline_filter_unsupported(caplog):
+    timeline = TimelineBuffer(MockViewer([Buffer(10)]))
+    timeline.set_filter("a")
+    assert timeline.line_filter is None
+    assert "not supported" in caplog.text
@@ -0,0 +1,312 @@
+import asyncio
+
+import pytest
+
+from multiplex import ansi, tasks, writer
+from multiplex.actions import BoxActions, SetTitle, ToggleCollapse, UpdateMetadata
+from multiplex.box import BoxHolder
+from multiplex.iterator import Iterator
+from multiplex.refs import STREAM_DONE
+from multiplex.viewer import Viewer
+
+pytestmark = pytest.mark.asyncio
+
+
+def create_viewer(monkeypatch, painted, frames=None):
+    viewer = Viewer(
+        descriptors=[],
+        box_height=None,
+        auto_collapse=False,
+        verbose=False,
+        socket_path=None,
+        output_path=None,
+        buffer_lines=None,
+        throttle=100,
+    )
+    viewer.cols = 80
+    viewer.lines = 30
+    frames = [] if frames is None else frames
+
+    def update_box_text(i):
+        holder = viewer.get_holder(i)
+        viewer.painted_layout[holder] = viewer._get_box_layout(i)
+        holder.last_paint_time = viewer.loop.time()
+        painted.append((i, viewer.last_frame_time))
+
+    def flush():
+        # the rows written in each frame
+        frames.append(ansi.rows)
+        monkeypatch.setattr(ansi, "rows", {})
+        monkeypatch.setattr(ansi, "regions", [])
+
+    monkeypatch.setattr(viewer, "_update_box_text", update_box_text)
+    monkeypatch.setattr(viewer, "_update_cursor", lambda: None)
+    monkeypatch.setattr(ansi, "flush", flush)
+    monkeypatch.setattr(ansi, "rows", {})
+    monkeypatch.setattr(ansi, "regions", [])
+    monkeypatch.setattr(writer, "is_busy", lambda: False)
+    for index in range(2):
+        viewer.holders.append(
+            BoxHolder(
+                index,
+                Iterator(None, f"box{index}", None, {}),
+                box_height=None,
+                viewer=viewer,
+            )
+        )
+    viewer._update_holders()
+    return viewer
+
+
+async def test_throttled_box_does_not_delay_other_boxes(monkeypatch):
+    painted = []
+    viewer = create_viewer(monkeypatch, painted)
+    throttled, quiet = viewer.holders
+    loop = viewer.loop
+    throttled.line_rate.add(1000, loop.time() - 1)
+    throttled.line_rate.add(1000, loop.time())
+    viewer.mark_box(throttled)
+    viewer._render_frame()
+    # painted once, further output of the throttled box waits for its next slot
+    viewer.mark_box(throttled)
+    viewer._render_frame()
+    assert viewer.frame_handle.when() - loop.time() > 0.2
+
+    start = loop.time()
+    viewer.mark_box(quiet)
+    viewer._schedule_frame()
+    await asyncio.sleep(viewer.frame_interval * 2)
+    quiet_paints = [when for index, when in painted if index == quiet.index]
+    assert quiet_paints and quiet_paints[0] - start <= viewer.frame_interval + 0.01
+    assert throttled in viewer.dirty_boxes
+    assert viewer.frame_handle
+    viewer.frame_handle.cancel()
+
+
+async def wait_for_tasks(viewer):
+    while viewer.tasks.tasks:
+        await asyncio.sleep(0.001)
+
+
+async def test_search_next_near_end(monkeypatch):
+    viewer = create_viewer(monkeypatch, [])
+    monkeypatch.setattr(viewer, "mark_view", lambda clear=False: None)
+    holder = viewer.holders[0]
+    holder.state.box_height = 10
+    holder.buffer.write("".join(f"{i}\n" for i in range(1, 61)))
+    box = holder.box
+    box.search("5$")
+    await wait_for_tasks(viewer)
+    matches = [box.state.search_raw_line]
+    for _ in range(6):
+        box.search_next()
+        await wait_for_tasks(viewer)
+        matches.append(box.state.search_raw_line)
+    # "5", "15" ... "55" and wrapped around to "5", although the view can not start at "55"
+    assert matches == [4, 14, 24, 34, 44, 54, 4]
+    assert box.state.buffer_start_line == 4
+    for _ in range(2):
+        box.search_next(reverse=True)
+        await wait_for_tasks(viewer)
+        matches.append(box.state.search_raw_line)
+    assert matches[-2:] == [54, 44]
+    assert box.state.buffer_start_line == 44
+
+
+async def test_reflow_focused_box_first(monkeypatch):
+    viewer = create_viewer(monkeypatch, [])
+    for holder in viewer.holders:
+        holder.state.box_height = 10
+        holder.buffer.write("x" * 100 + "\n")
+    focused, other = viewer.holders
+    viewer.cols = 50
+    viewer._reflow_boxes()
+    assert focused.buffer.width == 50
+    assert other.buffer.width != 50
+    assert viewer.tasks.status == ("reflow", 0)
+    await wait_for_tasks(viewer)
+    assert other.buffer.width == 50
+
+
+async def test_output_burst_renders_once_per_frame(monkeypatch):
+    viewer = create_viewer(monkeypatch, [])
+    flushes = []
+    monkeypatch.setattr(ansi, "flush", lambda: flushes.append(viewer.loop.time()))
+    viewer.frame_interval = 0.02
+    viewer.throttle = 0
+    viewer.stream_id_to_holder["s"] = viewer.holders[0]
+    loop = viewer.loop
+    end = loop.time() + 0.1
+    while loop.time() < end:
+        flush_count = len(flushes)
+        for _ in range(10):
+            await viewer._handle_event("s", "line\n")
+        # output is only flushed by the frame scheduler
+        assert len(flushes) == flush_count
+        assert viewer.frame_handle
+        await asyncio.sleep(0.001)
+    await asyncio.sleep(viewer.frame_interval * 2)
+    assert 0 < len(flushes) <= 0.1 / viewer.frame_interval + 2
+    gaps = [b - a for a, b in zip(flushes, flushes[1:])]
+    assert all(gap >= viewer.frame_interval - 0.005 for gap in gaps)
+    assert not viewer.dirty_boxes
+
+
+async def test_key_renders_immediately(monkeypatch):
+    painted = []
+    viewer = create_viewer(monkeypatch, painted)
+    flushes = []
+    monkeypatch.setattr(ansi, "flush", lambda: flushes.append(viewer.loop.time()))
+    viewer.frame_interval = 10
+    viewer.last_frame_time = viewer.loop.time()
+    await viewer._handle_event(-1, [lambda v: 0])
+    assert [index for index, _ in painted] == [0]
+    assert len(flushes) == 1
+    assert not viewer.frame_handle
+
+
+def render_event(viewer, painted, frames):
+    painted.clear()
+    frames.clear()
+    viewer._render_frame()
+    return [index for index, _ in painted], frames[0]
+
+
+async def test_stream_events_repaint_moved_boxes(monkeypatch):
+    painted, frames, clears = [], [], []
+    viewer = create_viewer(monkeypatch, painted, frames)
+    monkeypatch.setattr(ansi, "clear", lambda: clears.append(True))
+    viewer.auto_collapse = True
+    for index, holder in enumerate(viewer.holders):
+        viewer.stream_id_to_holder[f"s{index}"] = holder
+    viewer.mark_view()
+    render_event(viewer, painted, frames)
+
+    # the first box collapses and the second box moves up
+    await viewer._handle_event("s0", ToggleCollapse(True))
+    assert render_event(viewer, painted, frames)[0] == [0, 1]
+    # the last box collapses, the first box did not move
+    await viewer._handle_event("s1", STREAM_DONE)
+    assert render_event(viewer, painted, frames)[0] == [1]
+    await viewer._handle_event("s0", STREAM_DONE)
+    assert render_event(viewer, painted, frames)[0] == [0]
+    assert not clears
+
+
+async def test_title_action_repaints_title_row(monkeypatch):
+    painted, frames = [], []
+    viewer = create_viewer(monkeypatch, painted, frames)
+    for index, holder in enumerate(viewer.holders):
+        viewer.stream_id_to_holder[f"s{index}"] = holder
+    viewer.mark_view()
+    render_event(viewer, painted, frames)
+
+    await viewer._handle_event("s1", BoxActions([UpdateMetadata({"exit_code": 0}), SetTitle("done")]))
+    assert not viewer.dirty_boxes and not viewer.dirty_layout
+    boxes, rows = render_event(viewer, painted, frames)
+    assert boxes == []
+    assert list(rows) == [viewer.get_title_line(1)[0]]
+    assert "done" in rows[viewer.get_title_line(1)[0]]
+    # the status bar shows the title of the focused box
+    await viewer._handle_event("s0", SetTitle("done"))
+    boxes, rows = render_event(viewer, painted, frames)
+    assert boxes == []
+    assert sorted(rows) == [viewer.get_title_line(0)[0], viewer.get_status_bar_line()]
+
+
+def count_calls(monkeypatch, viewer, name):
+    calls = []
+    fn = getattr(viewer, name)
+
+    def counted(*args):
+        calls.append(args)
+        return fn(*args)
+
+    monkeypatch.setattr(viewer, name, counted)
+    return calls
+
+
+async def test_title_cache(monkeypatch):
+    viewer = create_viewer(monkeypatch, [])
+    renders = count_calls(monkeypatch, viewer, "_render_title_line")
+
+    def render_titles():
+        renders.clear()
+        viewer._update_title_lines()
+        return len(renders)
+
+    assert render_titles() == 2
+    assert render_titles() == 0
+    viewer.current_focused_box = 1
+    assert render_titles() == 2
+    viewer.cols = 60
+    assert render_titles() == 2
+    viewer.holders[1].state.stream_done = True
+    assert render_titles() == 1
+    viewer.holders[0].iterator.title = "renamed"
+    assert render_titles() == 1
+    assert render_titles() == 0
+
+
+async def test_status_bar_cache(monkeypatch):
+    viewer = create_viewer(monkeypatch, [])
+    renders = count_calls(monkeypatch, viewer, "_render_status_bar")
+
+    def render_status_bar():
+        renders.clear()
+        viewer._update_status_bar()
+        return len(renders)
+
+    assert render_status_bar() == 1
+    assert render_status_bar() == 0
+    viewer.current_focused_box = 1
+    assert render_status_bar() == 1
+    viewer.cols = 60
+    assert render_status_bar() == 1
+    viewer.input_reader.pending.append(ord("g"))
+    assert render_status_bar() == 1
+    assert render_status_bar() == 0
+    task = tasks.Task("reflow", iter(()), on_done=None, priority=tasks.BACKGROUND)
+    viewer.tasks.tasks.append(task)
+    assert render_status_bar() == 1
+    task.progress = 0.5
+    assert render_status_bar() == 1
+    assert render_status_bar() == 0
+    viewer.prompt.start("/", callback=None)
+    assert render_status_bar() == 1
+    viewer.prompt.text = "a"
+    assert render_status_bar() == 1
+    assert render_status_bar() == 0
+
+
+async def send_keys(viewer, data):
+    viewer.input_reader.data.extend(data)
+    while viewer.input_reader.data:
+        result = viewer.input_reader._read_iteration()
+        if result is not None:
+            await viewer._handle_event(-1, result)
+
+
+async def test_unfocused_terminal_pauses_rendering(monkeypatch):
+    painted, frames = [], []
+    viewer = create_viewer(monkeypatch, painted, frames)
+    monkeypatch.setattr(ansi, "invalidate", lambda: frames.append("invalidate"))
+    viewer.frame_interval = 0.01
+    viewer.stream_id_to_holder["s"] = viewer.holders[1]
+    await send_keys(viewer, b"\x1b[O")
+    assert not viewer.terminal_focused
+    frames.clear()
+    for _ in range(5):
+        await viewer._handle_event("s", "line\n")
+        await asyncio.sleep(viewer.frame_interval * 2)
+    assert not frames
+    assert viewer.holders[1] in viewer.dirty_boxes
+
+    painted.clear()
+    await send_keys(viewer, b"\x1b[I")
+    # the skipped frames are painted at once, as a full repaint
+    assert frames[0] == "invalidate"
+    assert len(frames) == 2
+    assert sorted(index for index, _ in painted) == [0, 1]
+    assert viewer.get_title_line(1)[0] in frames[1]
+    assert not viewer.dirty_boxes
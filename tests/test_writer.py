@@ -0,0 +1,96 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+from multiplex import writer
+
+pytestmark = pytest.mark.asyncio
+
+
+def setup_writer(monkeypatch, loop):
+    read_fd, write_fd = os.pipe()
+    os.set_blocking(write_fd, False)
+    drained = asyncio.Event()
+    monkeypatch.setattr(writer, "fd", write_fd)
+    monkeypatch.setattr(writer, "loop", loop)
+    monkeypatch.setattr(writer, "on_drain", drained.set)
+    monkeypatch.setattr(writer, "pending", bytearray())
+    return read_fd, drained
+
+
+def read_available(read_fd):
+    os.set_blocking(read_fd, False)
+    result = bytearray()
+    while True:
+        try:
+            data = os.read(read_fd, 65536)
+        except BlockingIOError:
+            return bytes(result)
+        if not data:
+            return bytes(result)
+        result.extend(data)
+
+
+async def test_partial_write_drains(monkeypatch):
+    loop = asyncio.get_running_loop()
+    read_fd, drained = setup_writer(monkeypatch, loop)
+    first = "a" * 200000
+    writer.write(first)
+    assert writer.is_busy()
+    assert 0 < len(writer.pending) < len(first)
+    writer.write("b" * 10)
+    assert writer.pending.endswith(b"a" + b"b" * 10)
+    received = bytearray()
+    while not drained.is_set():
+        received.extend(read_available(read_fd))
+        await asyncio.sleep(0.001)
+    received.extend(read_available(read_fd))
+    assert not writer.is_busy()
+    assert received == (first + "b" * 10).encode()
+    os.close(read_fd)
+    os.close(writer.fd)
+
+
+async def test_full_pipe_queues_everything(monkeypatch):
+    loop = asyncio.get_running_loop()
+    read_fd, drained = setup_writer(monkeypatch, loop)
+    filled = 0
+    while True:
+        try:
+            filled += os.write(writer.fd, b"x" * 65536)
+        except BlockingIOError:
+            break
+    writer.write("tail")
+    assert writer.pending == b"tail"
+    assert len(read_available(read_fd)) == filled
+    await asyncio.wait_for(drained.wait(), 1)
+    assert read_available(read_fd) == b"tail"
+    os.close(read_fd)
+    os.close(writer.fd)
+
+
+async def test_restore_flushes_pending(monkeypatch):
+    loop = asyncio.get_running_loop()
+    read_fd, _ = setup_writer(monkeypatch, loop)
+    data = "c" * 300000
+    writer.write(data)
+    assert writer.is_busy()
+    received = bytearray()
+
+    def read_all():
+        while True:
+            chunk = os.read(read_fd, 65536)
+            if not chunk:
+                break
+            received.extend(chunk)
+
+    reader = threading.Thread(target=read_all)
+    reader.start()
+    writer.restore()
+    reader.join()
+    os.close(read_fd)
+    assert received == data.encode()
+    assert not writer.is_active()
+    assert not writer.is_busy()